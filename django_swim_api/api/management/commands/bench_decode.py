@@ -0,0 +1,123 @@
+# azure_api/management/commands/bench_decode.py
+from django.core.management.base import BaseCommand
+from ...services import eventgrid
+from ...services.eventgrid import DecodePipeline
+from datetime import datetime, timedelta, timezone
+import base64, json, os, random, time, uuid
+
+
+def make_event(device_id, enqueued_time, round_count, slim_count):
+    """Event Grid DeviceTelemetry event shaped like generate_test_payload.generate_event."""
+    payload = {
+        "deviceId": device_id,
+        "utc": enqueued_time,
+        "state": {
+            "schemaVersion": 1,
+            "totalRoundCount": round_count,
+            "totalSlimCount": slim_count,
+            "totalVoidRoundMl": round(random.uniform(0, 1000), 2),
+            "totalVoidSlimMl": round(random.uniform(0, 1000), 2),
+        },
+    }
+    return {
+        "id": str(uuid.uuid4()),
+        "topic": "/SUBSCRIPTIONS/test-sub/RESOURCEGROUPS/test-rg/PROVIDERS/MICROSOFT.DEVICES/IOTHUBS/test-hub",
+        "subject": f"devices/{device_id}",
+        "eventType": "Microsoft.Devices.DeviceTelemetry",
+        "data": {
+            "properties": {},
+            "systemProperties": {
+                "iothub-content-type": "application/json",
+                "iothub-content-encoding": "utf-8",
+                "iothub-connection-device-id": device_id,
+                "iothub-enqueuedtime": enqueued_time,
+                "iothub-message-source": "Telemetry",
+            },
+            "body": base64.b64encode(json.dumps(payload).encode()).decode(),
+        },
+        "dataVersion": "",
+        "metadataVersion": "1",
+        "eventTime": enqueued_time,
+    }
+
+
+class Command(BaseCommand):
+    help = "Measure Event Grid decode throughput (events/sec) against worker count, for capture streams and single webhook bodies. Usage: python manage.py bench_decode --events 100000 --workers 1,2,4 --body-events 500,5000,50000"
+
+    def add_arguments(self, parser):
+        cores = os.cpu_count() or 1
+        default_workers = ",".join(str(n) for n in sorted({1, 2, 4, cores}) if n <= max(cores, 1))
+        parser.add_argument("--events", type=int, default=100000, help="Synthetic events to decode")
+        parser.add_argument("--per-line", type=int, default=100, help="Events per captured webhook body (line)")
+        parser.add_argument("--workers", default=default_workers, help="Comma-separated worker counts to compare")
+        parser.add_argument("--chunk-size", type=int, default=64, help="Lines per pool task")
+        parser.add_argument("--body-events", default="500,5000,50000", help="Comma-separated webhook body sizes (events) for DecodePipeline.decode_request")
+        parser.add_argument("--repeat", type=int, default=5, help="Timed decodes per webhook body; the best is reported")
+
+    def handle(self, *args, **options):
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        events = [
+            make_event(f"Device-{i % 500:04d}", (start + timedelta(seconds=i)).strftime("%Y-%m-%dT%H:%M:%SZ"), i, i // 2)
+            for i in range(options["events"])
+        ]
+        per_line = max(1, options["per_line"])
+        lines = [
+            (n + 1, json.dumps(events[i:i + per_line]).encode())
+            for n, i in enumerate(range(0, len(events), per_line))
+        ]
+        parser_name = "orjson" if eventgrid.orjson is not None else "json"
+        self.stdout.write(f"{len(events)} events in {len(lines)} lines, parser={parser_name}, cores={os.cpu_count()}")
+        self.stdout.write(f"{'workers':>8}{'seconds':>10}{'events/s':>12}{'speedup':>9}")
+
+        baseline = None
+        for workers in [int(w) for w in options["workers"].split(",") if w.strip()]:
+            with DecodePipeline(workers=workers, chunk_size=options["chunk_size"]) as pipeline:
+                if workers > 1:
+                    list(pipeline.imap_lines(lines[:workers]))  # warm the pool so startup isn't timed
+                started = time.perf_counter()
+                decoded = sum(len(result.readings) for result in pipeline.imap_lines(lines))
+                elapsed = time.perf_counter() - started
+            rate = decoded / elapsed
+            baseline = baseline or rate
+            self.stdout.write(f"{workers:>8}{elapsed:>10.2f}{rate:>12,.0f}{rate / baseline:>9.2f}")
+
+        self._bench_bodies(events, [int(w) for w in options["workers"].split(",") if w.strip()], options)
+
+    def _bench_bodies(self, events, worker_counts, options):
+        """
+        One webhook body per call, as decode_request receives it. `parsed` is
+        the parent parsing the body and decoding the event dicts itself;
+        `raw` is the inline path of decode_request; `pool N` ships the raw
+        bytes to N workers (inline_bytes=0 forces the pool).
+        """
+        sizes = [int(n) for n in options["body_events"].split(",") if n.strip()]
+        repeat = max(1, options["repeat"])
+        self.stdout.write(f"\nWebhook body decode (best of {repeat}, ms)")
+        modes = ["parsed", "raw"] + [f"pool {w}" for w in worker_counts if w > 1]
+        self.stdout.write(f"{'events':>8}{'MB':>8}" + "".join(f"{mode:>10}" for mode in modes))
+        pools = {w: DecodePipeline(workers=w, inline_bytes=0) for w in worker_counts if w > 1}
+        try:
+            for pipeline in pools.values():
+                pipeline.decode_request(json.dumps(events[:10]).encode())  # warm the pool
+            for size in sizes:
+                raw = json.dumps(events[:size]).encode()
+                runs = {
+                    "parsed": lambda: eventgrid.decode_events(eventgrid.loads(raw)),
+                    "raw": lambda: eventgrid.decode_request(raw),
+                }
+                for workers, pipeline in pools.items():
+                    runs[f"pool {workers}"] = lambda pipeline=pipeline: pipeline.decode_request(raw)
+                cells = "".join(f"{self._best(runs[mode], repeat) * 1000:>10.1f}" for mode in modes)
+                self.stdout.write(f"{min(size, len(events)):>8}{len(raw) / 1e6:>8.2f}{cells}")
+        finally:
+            for pipeline in pools.values():
+                pipeline.close()
+
+    @staticmethod
+    def _best(run, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
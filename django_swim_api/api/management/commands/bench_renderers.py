@@ -0,0 +1,60 @@
+# azure_api/management/commands/bench_renderers.py
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from ...renderers import MessagePackRenderer
+from ...services.compression import compress, supported_encodings
+from datetime import datetime, timedelta, timezone
+import random, time
+
+
+def make_rows(n):
+    """Synthetic azure_data rows shaped like the Supabase list response."""
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for i in range(n):
+        ts = (start + timedelta(seconds=30 * i)).isoformat()
+        round_count = random.randint(0, 100)
+        slim_count = random.randint(0, 100)
+        rows.append({
+            "id": i + 1,
+            "device_id": random.randint(1, 50),
+            "azure_device_id": f"Device-{random.randint(1, 50):04d}",
+            "round_count": round_count,
+            "slim_count": slim_count,
+            "round_void_count": round(random.uniform(0, 20), 2),
+            "slim_void_count": round(random.uniform(0, 20), 2),
+            "enqueued_at": ts,
+            "raw_payload": {"round_count": round_count, "slim_count": slim_count, "timestamp": ts},
+            "created_at": ts,
+        })
+    return rows
+
+
+class Command(BaseCommand):
+    help = "Compare wire size and encode time of JSON vs MessagePack (+gzip/zstd). Usage: python manage.py bench_renderers --rows 10000"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000, help="Number of synthetic rows to encode")
+        parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions (best is reported)")
+
+    def handle(self, *args, **options):
+        rows = make_rows(options["rows"])
+        repeat = max(1, options["repeat"])
+        renderers = [("json", JSONRenderer()), ("msgpack", MessagePackRenderer())]
+
+        baseline = None
+        self.stdout.write(f"{'format':<16}{'bytes':>14}{'ratio':>9}{'encode ms':>12}")
+        for name, renderer in renderers:
+            for encoding in [None] + supported_encodings():
+                best = None
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    body = renderer.render(rows)
+                    if encoding:
+                        body = compress(body, encoding)
+                    elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+                if baseline is None:
+                    baseline = len(body)
+                label = f"{name}+{encoding}" if encoding else name
+                self.stdout.write(f"{label:<16}{len(body):>14,}{len(body) / baseline:>9.2f}{best * 1000:>12.1f}")
@@ -0,0 +1,99 @@
+# azure_api/management/commands/bench_startup.py
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+import json, os, statistics, subprocess, sys, time
+
+# Runs in a fresh interpreter per sample. With --offline, the Supabase client is
+# created for a placeholder project and pointed at an in-memory FakePostgrest
+# when it is first used, so no credentials are needed and lazy imports are
+# timed exactly as they happen against the real project.
+CHILD = """
+import io, json, os, sys, time
+started = time.perf_counter()
+options = json.loads(sys.argv[1])
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "django_swim_api.settings")
+
+if options["offline"]:
+    from api.services import supabase_client
+    def offline_client():
+        if supabase_client._client is None:
+            from api.testing import FakePostgrest, placeholder_client
+            # keep a reference: collecting the context manager would uninstall the fake
+            offline_client.installed = FakePostgrest(latency=options["latency"]).installed(placeholder_client())
+            offline_client.installed.__enter__()
+        return supabase_client._client
+    supabase_client.get_supabase = offline_client
+
+timings = {}
+if options["scenario"] == "ensure_today":
+    from django.core.management import execute_from_command_line
+    errors = io.StringIO()
+    with open(os.devnull, "w") as devnull:
+        sys.stdout, sys.stderr = devnull, errors
+        execute_from_command_line(["manage.py", "ensure_today"])
+        sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+    timings["run"] = time.perf_counter() - started
+    # ensure_today reports failures on stderr and exits 0; an error path is not a timing
+    if errors.getvalue():
+        sys.exit("ensure_today failed: " + errors.getvalue().strip())
+else:
+    from wsgiref.util import setup_testing_defaults
+    from django_swim_api.wsgi import application
+    timings["boot"] = time.perf_counter() - started
+    path, _, query = options["path"].partition("?")
+    statuses = []
+    for label in ("first", "second"):
+        environ = {"PATH_INFO": path, "QUERY_STRING": query}
+        setup_testing_defaults(environ)
+        request_started = time.perf_counter()
+        response = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+        b"".join(response)
+        response.close()
+        timings[label] = time.perf_counter() - request_started
+    timings["status"] = statuses[0]
+print(json.dumps(timings))
+"""
+
+
+class Command(BaseCommand):
+    help = "Benchmark process cold start: `manage.py ensure_today` end to end, and WSGI boot + first/second request latency with and without boot warm-up. Usage: python manage.py bench_startup --runs 5 --offline"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5, help="Fresh processes per scenario")
+        parser.add_argument("--path", default="/api/azure-data/?limit=1", help="Request timed after boot")
+        parser.add_argument("--offline", action="store_true", help="Serve Supabase calls from an in-memory FakePostgrest")
+        parser.add_argument("--latency-ms", type=float, default=0, help="Per-call latency injected by --offline")
+
+    def handle(self, *args, **options):
+        base = {"offline": options["offline"], "latency": options["latency_ms"] / 1000, "path": options["path"]}
+        target = "FakePostgrest" if options["offline"] else os.getenv("SUPABASE_URL")
+        self.stdout.write(f"{options['runs']} runs per scenario against {target}")
+
+        samples = self._sample(dict(base, scenario="ensure_today"), options["runs"])
+        self.stdout.write("\nmanage.py ensure_today (process wall time)")
+        self.stdout.write(f"  min {min(s['wall'] for s in samples):.3f}s  median {statistics.median(s['wall'] for s in samples):.3f}s")
+
+        self.stdout.write(f"\nWSGI {options['path']} (median seconds)")
+        self.stdout.write(f"  {'mode':<10}{'process':>9}{'boot':>9}{'first':>9}{'second':>9}  status")
+        for warm in ("1", "0"):
+            samples = self._sample(dict(base, scenario="request"), options["runs"], STARTUP_WARM_UP=warm)
+            label = "warm-up" if warm == "1" else "lazy"
+            cells = "".join(f"{statistics.median(s[key] for s in samples):>9.3f}" for key in ("wall", "boot", "first", "second"))
+            self.stdout.write(f"  {label:<10}{cells}  {samples[-1]['status']}")
+
+    def _sample(self, child_options, runs, **env):
+        samples = []
+        for _ in range(max(1, runs)):
+            started = time.perf_counter()
+            proc = subprocess.run(
+                [sys.executable, "-c", CHILD, json.dumps(child_options)],
+                capture_output=True, text=True, cwd=settings.BASE_DIR, env=dict(os.environ, **env),
+            )
+            wall = time.perf_counter() - started
+            if proc.returncode != 0:
+                self.stderr.write(proc.stderr.strip())
+                continue
+            samples.append(dict(json.loads(proc.stdout.strip().splitlines()[-1]), wall=wall))
+        if not samples:
+            raise CommandError(f"Every {child_options['scenario']} run failed")
+        return samples
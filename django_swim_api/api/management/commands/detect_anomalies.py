@@ -0,0 +1,98 @@
+# azure_api/management/commands/detect_anomalies.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from ...services.supabase_client import supabase
+from ...services.resilience import execute
+from ...services.anomalies import WatermarkStore, describe, detect, load_device_columns
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, wait
+import json, os
+
+
+class Command(BaseCommand):
+    help = "Report reporting gaps, negative counter deltas and void outliers per device, resuming from stored watermarks. Usage: python manage.py detect_anomalies --gap-minutes 60"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--device", action="append", help="azure_device_id to scan (repeatable; default: all devices)")
+        parser.add_argument("--gap-minutes", type=float, default=60, help="Report silences longer than this")
+        parser.add_argument("--z-threshold", type=float, default=4.0, help="Rolling z-score above which a void delta is an outlier")
+        parser.add_argument("--window", type=int, default=48, help="Readings in the rolling z-score window")
+        parser.add_argument("--workers", type=int, default=min(8, (os.cpu_count() or 1) * 2), help="Threads scanning devices concurrently, fetch and detect (1 runs inline)")
+        parser.add_argument("--max-rows", type=int, default=0, help="Cap rows per device per run (0 = no cap)")
+        parser.add_argument("--full", action="store_true", help="Ignore stored watermarks of the scanned devices and rescan their history")
+        parser.add_argument("--json", action="store_true", help="Print findings as JSON lines")
+
+    def handle(self, *args, **options):
+        store = WatermarkStore(settings.ANOMALY_STATE_FILE)
+        # Always start from the stored state: --full only resets the devices scanned
+        # below, so other devices keep their watermarks when it is saved again
+        self.state = store.load()
+        self.as_json = options["json"]
+        self.found = 0
+        params = {
+            "gap_seconds": options["gap_minutes"] * 60,
+            "z_threshold": options["z_threshold"],
+            "window": options["window"],
+        }
+        workers = max(1, options["workers"])
+        devices = options["device"] or self._all_devices()
+        self.stdout.write(f"Scanning {len(devices)} devices with {workers} worker(s)")
+
+        # The run is dominated by keyset-paged HTTP fetches (detect() is a few
+        # vectorised passes), so each worker thread scans one device end to end.
+        # Watermarks and findings are merged here, in the parent thread.
+        pool = ThreadPoolExecutor(workers) if workers > 1 else None
+        pending = {}
+        try:
+            for device in devices:
+                entry = {} if options["full"] else self.state.get(device, {})
+                if pool is None:
+                    self._record(device, self._scan(device, entry, options["max_rows"], params))
+                    continue
+                future = pool.submit(self._scan, device, entry, options["max_rows"], params)
+                pending[future] = device
+                if len(pending) >= 2 * workers:
+                    self._drain(pending, FIRST_COMPLETED)
+            self._drain(pending)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            store.save(self.state)
+
+        self.stdout.write(self.style.SUCCESS(f"Scan complete. {self.found} finding(s)."))
+
+    def _all_devices(self, page_size=1000):
+        devices = []
+        start = 0
+        while True:
+            res = execute(supabase.table("devices").select("azure_device_id").order("id").range(start, start + page_size - 1))
+            devices.extend(row["azure_device_id"] for row in res.data)
+            if len(res.data) < page_size:
+                return devices
+            start += page_size
+
+    @staticmethod
+    def _scan(device, entry, max_rows, params):
+        """Fetch a device's rows past its watermark and run detection; None if there are none."""
+        after = tuple(entry["watermark"]) if entry.get("watermark") else None
+        columns, enqueued_at = load_device_columns(device, after=after, max_rows=max_rows or None)
+        if columns is None:
+            return None
+        return columns, enqueued_at, detect(columns, entry.get("context"), **params)
+
+    def _drain(self, pending, return_when=ALL_COMPLETED):
+        done, _ = wait(pending, return_when=return_when)
+        for future in done:
+            self._record(pending.pop(future), future.result())
+
+    def _record(self, device, scanned):
+        if scanned is None:
+            return
+        columns, enqueued_at, (findings, context) = scanned
+        self.state[device] = {"watermark": [enqueued_at[-1], int(columns["id"][-1])], "context": context}
+        self.found += len(findings)
+        for finding in describe(findings, columns, enqueued_at, device):
+            if self.as_json:
+                self.stdout.write(json.dumps(finding))
+            else:
+                detail = ", ".join(f"{k}={v}" for k, v in finding.items() if k not in ("azure_device_id", "id", "enqueued_at", "type"))
+                self.stdout.write(f"{device} {finding['enqueued_at']} #{finding['id']} {finding['type']}: {detail}")
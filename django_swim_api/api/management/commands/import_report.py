@@ -0,0 +1,73 @@
+# azure_api/management/commands/import_report.py
+from django.core.management.base import BaseCommand, CommandError
+from collections import defaultdict
+import json, os, subprocess, sys
+
+# Runs in a fresh interpreter under -X importtime. The modules loaded by
+# django.setup() are printed first so the report can separate them from the target.
+CHILD = """
+import json, sys
+import django
+django.setup()
+print(json.dumps(sorted(sys.modules)), flush=True)
+for target in sys.argv[1:]:
+    __import__(target)
+"""
+
+
+def parse_importtime(stderr):
+    """(module, self_us, cumulative_us, depth) per `import time:` line, in completion order."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+
+class Command(BaseCommand):
+    help = "Report what a startup path imports and how long it takes. Usage: python manage.py import_report --target api.management.commands.ensure_today --budget-ms 50"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target", action="append", help="Module to import after django.setup() (repeatable; default: the project URLconf)")
+        parser.add_argument("--top", type=int, default=15, help="Rows per table")
+        parser.add_argument("--budget-ms", type=float, help="Fail if importing the targets (beyond django.setup()) takes longer than this")
+
+    def handle(self, *args, **options):
+        targets = options["target"] or ["django_swim_api.urls"]
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", CHILD, *targets],
+            capture_output=True, text=True, env=os.environ.copy(),
+        )
+        if proc.returncode != 0:
+            raise CommandError(f"Import failed:\n{proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else proc.returncode}")
+        setup_modules = set(json.loads(proc.stdout.splitlines()[0]))
+        entries = parse_importtime(proc.stderr)
+
+        setup_us = sum(e[1] for e in entries if e[0] in setup_modules)
+        target_entries = [e for e in entries if e[0] not in setup_modules]
+        target_us = sum(e[1] for e in target_entries)
+        self.stdout.write(f"django.setup(): {setup_us / 1000:.0f} ms")
+        self.stdout.write(f"{', '.join(targets)}: {target_us / 1000:.0f} ms ({len(target_entries)} modules)")
+
+        by_package = defaultdict(int)
+        for name, self_us, _, _ in target_entries:
+            by_package[name.split(".")[0]] += self_us
+        self.stdout.write(f"\n{'package':<32}{'ms':>8}{'share':>8}")
+        for package, us in sorted(by_package.items(), key=lambda item: -item[1])[:options["top"]]:
+            self.stdout.write(f"{package:<32}{us / 1000:>8.1f}{us / max(target_us, 1):>8.0%}")
+
+        # Which of our modules pull those packages in
+        ours = [e for e in target_entries if e[0].split(".")[0] in ("api", "django_swim_api")]
+        if ours:
+            self.stdout.write(f"\n{'project module (cumulative)':<48}{'ms':>8}")
+            for name, _, cumulative_us, _ in sorted(ours, key=lambda e: -e[2])[:options["top"]]:
+                self.stdout.write(f"{name:<48}{cumulative_us / 1000:>8.1f}")
+
+        budget = options["budget_ms"]
+        if budget is not None:
+            if target_us / 1000 > budget:
+                raise CommandError(f"Import budget exceeded: {target_us / 1000:.0f} ms > {budget:.0f} ms")
+            self.stdout.write(self.style.SUCCESS(f"Within import budget ({budget:.0f} ms)."))
@@ -0,0 +1,103 @@
+# azure_api/management/commands/replay_events.py
+from django.core.management.base import BaseCommand, CommandError
+from ...serializers import AzureDataSerializer
+from ...services.eventgrid import DecodePipeline, iter_capture_lines
+from ...services.ingest import bulk_insert_readings
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import os, time
+
+
+class Command(BaseCommand):
+    help = "Backfill azure_data from a JSONL capture of Event Grid requests. Usage: python manage.py replay_events capture.jsonl --batch-size 1000 --concurrency 4"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="JSONL file; each line is an Event Grid event or an array of events")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Readings per bulk insert")
+        parser.add_argument("--concurrency", type=int, default=4, help="Bulk inserts in flight at once")
+        parser.add_argument("--decode-workers", type=int, default=os.cpu_count() or 1, help="Processes decoding events (1 decodes inline)")
+        parser.add_argument("--dry-run", action="store_true", help="Decode and count only; insert nothing")
+        parser.add_argument("--report-every", type=float, default=5.0, help="Seconds between throughput reports")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        concurrency = max(1, options["concurrency"])
+        self.dry_run = options["dry_run"]
+        self.report_every = options["report_every"]
+        self.decoded = self.inserted = self.skipped = self.ignored = self.failed = 0
+        self.started = self.last_report = time.monotonic()
+
+        pending = set()
+        batch = []
+        try:
+            with DecodePipeline(workers=max(1, options["decode_workers"])) as decoder, ThreadPoolExecutor(concurrency) as pool:
+                for result in decoder.imap_lines(iter_capture_lines(options["path"])):
+                    self.ignored += result.ignored
+                    for line_number, message in result.errors:
+                        self.failed += 1
+                        self.stderr.write(f"Line {line_number}: {message}")
+                    readings = self._validated(result.readings)
+                    self.decoded += len(readings)
+                    batch.extend(readings)
+                    while len(batch) >= batch_size:
+                        pending.add(self._submit(pool, batch[:batch_size]))
+                        batch = batch[batch_size:]
+                        # Bound in-flight batches (and memory) to the concurrency limit
+                        while len(pending) >= concurrency:
+                            pending = self._collect(pending, FIRST_COMPLETED)
+                    self._maybe_report()
+                if batch:
+                    pending.add(self._submit(pool, batch))
+                while pending:
+                    pending = self._collect(pending, FIRST_COMPLETED)
+        except FileNotFoundError:
+            raise CommandError(f"Capture file not found: {options['path']}")
+
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        verb = "Decoded" if self.dry_run else "Inserted"
+        count = self.decoded if self.dry_run else self.inserted
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {count} readings in {elapsed:.1f}s ({count / elapsed:.0f}/s); "
+            f"skipped {self.skipped} for unknown devices, ignored {self.ignored} non-telemetry events, {self.failed} failed."
+        ))
+
+    def _validated(self, readings):
+        """
+        Drop readings the ingest API would reject (e.g. no enqueued_at in the
+        event), counting them as failed: one bad row would otherwise fail its
+        whole bulk insert and stop the backfill.
+        """
+        valid = []
+        for reading in readings:
+            serializer = AzureDataSerializer(data=reading)
+            if serializer.is_valid():
+                valid.append(reading)
+            else:
+                self.failed += 1
+                errors = "; ".join(f"{field}: {' '.join(map(str, messages))}" for field, messages in serializer.errors.items())
+                self.stderr.write(f"Invalid reading from {reading.get('azure_device_id')}: {errors}")
+        return valid
+
+    def _submit(self, pool, batch):
+        if self.dry_run:
+            return pool.submit(lambda: (0, []))
+        return pool.submit(bulk_insert_readings, batch)
+
+    def _collect(self, pending, return_when):
+        done, remaining = wait(pending, return_when=return_when)
+        for future in done:
+            try:
+                inserted, skipped = future.result()
+            except Exception as e:
+                raise CommandError(f"Bulk insert failed after {self.inserted} readings: {e}")
+            self.inserted += inserted
+            self.skipped += len(skipped)
+        self._maybe_report()
+        return remaining
+
+    def _maybe_report(self):
+        now = time.monotonic()
+        if now - self.last_report < self.report_every:
+            return
+        self.last_report = now
+        elapsed = now - self.started
+        self.stdout.write(f"{self.decoded} decoded ({self.decoded / elapsed:.0f}/s), {self.inserted} inserted ({self.inserted / elapsed:.0f}/s)")
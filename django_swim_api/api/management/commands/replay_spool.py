@@ -0,0 +1,59 @@
+# azure_api/management/commands/replay_spool.py
+from django.core.management.base import BaseCommand, CommandError
+from ...services.spool import spool
+from ...services.ingest import bulk_insert_readings
+import time
+
+
+class Command(BaseCommand):
+    help = "Replay telemetry spooled during Supabase outages using bulk inserts. Usage: python manage.py replay_spool --batch-size 500"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Records per bulk insert")
+        parser.add_argument("--no-seal", action="store_true", help="Only replay already-sealed segments; leave the active one alone")
+
+    def handle(self, *args, **options):
+        if spool is None:
+            raise CommandError("Spooling is disabled (INGEST_SPOOL_DIR is empty).")
+        batch_size = max(1, options["batch_size"])
+        if not options["no_seal"]:
+            spool.seal()
+
+        self.inserted = 0
+        self.skipped = 0
+        started = time.monotonic()
+        checkpoint = spool.load_checkpoint()
+
+        for segment in spool.sealed_segments():
+            offset = checkpoint["offset"] if checkpoint["segment"] == segment.name else 0
+            if offset:
+                self.stdout.write(f"Resuming {segment.name} at byte {offset}")
+            batch = []
+            end = offset
+            for end, record in spool.read_segment(segment, offset):
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    self._flush(segment, batch, end)
+                    batch = []
+            if batch:
+                self._flush(segment, batch, end)
+            spool.finish_segment(segment)
+            self.stdout.write(f"Replayed {segment.name}")
+
+        elapsed = max(time.monotonic() - started, 1e-9)
+        self.stdout.write(self.style.SUCCESS(
+            f"Replay complete. Inserted {self.inserted} records ({self.inserted / elapsed:.0f}/s), skipped {self.skipped} for unknown devices."
+        ))
+
+    def _flush(self, segment, batch, end_offset):
+        try:
+            inserted, skipped = bulk_insert_readings(batch)
+        except Exception as e:
+            raise CommandError(f"Replay stopped in {segment.name}; checkpoint kept, rerun to resume: {e}")
+        # Checkpoint after each committed batch (at-least-once: a crash here may replay one batch)
+        spool.save_checkpoint(segment.name, end_offset)
+        self.inserted += inserted
+        self.skipped += len(skipped)
+        for record in skipped:
+            self.stderr.write(f"Skipping record for unknown device: {record['azure_device_id']}")
+        self.stdout.write(f"Inserted {self.inserted} ({segment.name} @ {end_offset})")
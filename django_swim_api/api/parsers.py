@@ -0,0 +1,43 @@
+# azure_api/parsers.py
+import io
+
+import msgpack
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+from .services.compression import decompress
+
+
+class DecompressingParserMixin:
+    """
+    Transparently inflate request bodies sent with Content-Encoding: gzip/zstd
+    before handing them to the underlying parser.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = (parser_context or {}).get("request")
+        encoding = request.META.get("HTTP_CONTENT_ENCODING", "") if request is not None else ""
+        if encoding and encoding.strip().lower() != "identity":
+            try:
+                stream = io.BytesIO(decompress(stream.read(), encoding))
+            except ValueError as e:
+                raise ParseError(f"Compressed body error - {e}")
+        return super().parse(stream, media_type, parser_context)
+
+
+class MessagePackParser(BaseParser):
+    media_type = "application/msgpack"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, TypeError) as e:
+            raise ParseError(f"MessagePack parse error - {e}")
+
+
+class DecompressingJSONParser(DecompressingParserMixin, JSONParser):
+    pass
+
+
+class DecompressingMessagePackParser(DecompressingParserMixin, MessagePackParser):
+    pass
@@ -0,0 +1,63 @@
+# azure_api/renderers.py
+from datetime import date, datetime
+from decimal import Decimal
+from uuid import UUID
+
+import msgpack
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from .services.compression import MIN_COMPRESS_SIZE, choose_encoding, compress
+
+
+def _msgpack_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__} to MessagePack")
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=_msgpack_default, use_bin_type=True)
+
+
+class CompressedRendererMixin:
+    """
+    Compress the rendered body with gzip/zstd when the client's
+    Accept-Encoding allows it and the body is large enough to benefit.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        body = super().render(data, accepted_media_type, renderer_context)
+        renderer_context = renderer_context or {}
+        request = renderer_context.get("request")
+        response = renderer_context.get("response")
+        if request is None or response is None:
+            return body
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if len(body) < MIN_COMPRESS_SIZE or response.has_header("Content-Encoding"):
+            return body
+        encoding = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return body
+        response["Content-Encoding"] = encoding
+        return compress(body, encoding)
+
+
+class CompressedJSONRenderer(CompressedRendererMixin, JSONRenderer):
+    pass
+
+
+class CompressedMessagePackRenderer(CompressedRendererMixin, MessagePackRenderer):
+    pass
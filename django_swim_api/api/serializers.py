@@ -12,4 +12,75 @@ class AzureDataSerializer(serializers.Serializer):
     azure_device_id = serializers.CharField(max_length=255, help_text="Azure IoT Hub device ID (used to lookup device)")
     raw_payload = serializers.JSONField(required=False, allow_null=True, help_text="Raw device payload (optional)")
     created_at = serializers.DateTimeField(read_only=True)
-    device_id = serializers.CharField(read_only=True, help_text="Device UUID (auto-populated from device lookup)")
\ No newline at end of file
+    device_id = serializers.CharField(read_only=True, help_text="Device UUID (auto-populated from device lookup)")
+
+class AzureDataBulkFilterSerializer(serializers.Serializer):
+    """Selects azure_data rows for bulk operations: an explicit id list and/or a device + enqueued_at range."""
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False, max_length=1000, help_text="Explicit record ids (max 1000)")
+    azure_device_id = serializers.CharField(max_length=255, required=False, help_text="Restrict to one Azure IoT Hub device ID")
+    device_id = serializers.IntegerField(required=False, help_text="Restrict to one devices.id")
+    enqueued_from = serializers.DateTimeField(required=False, help_text="enqueued_at lower bound (inclusive)")
+    enqueued_to = serializers.DateTimeField(required=False, help_text="enqueued_at upper bound (exclusive)")
+    dry_run = serializers.BooleanField(default=False, help_text="Only report how many rows would be affected")
+
+    def validate(self, attrs):
+        # Never allow an unscoped statement to touch the whole table
+        if not any(attrs.get(key) is not None for key in ("ids", "azure_device_id", "device_id")):
+            raise serializers.ValidationError("Provide ids, azure_device_id or device_id to scope the operation.")
+        start, end = attrs.get("enqueued_from"), attrs.get("enqueued_to")
+        if start and end and start >= end:
+            raise serializers.ValidationError("enqueued_from must be before enqueued_to.")
+        return attrs
+
+
+class AzureDataBulkValuesSerializer(serializers.Serializer):
+    round_count = serializers.IntegerField(required=False)
+    slim_count = serializers.IntegerField(required=False)
+    round_void_count = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    slim_void_count = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    raw_payload = serializers.JSONField(required=False, allow_null=True)
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError("Provide at least one field to set.")
+        return attrs
+
+
+class AzureDataBulkUpdateSerializer(AzureDataBulkFilterSerializer):
+    set = AzureDataBulkValuesSerializer(help_text="Fields to overwrite on every matched row")
+
+
+class DeviceSerializer(serializers.Serializer):
+    id = serializers.IntegerField(read_only=True)
+    azure_device_id = serializers.CharField(max_length=255, help_text="Azure IoT Hub device ID")
+    created_at = serializers.DateTimeField(read_only=True)
+    updated_at = serializers.DateTimeField(read_only=True)
+
+
+class DeviceBulkUpsertSerializer(serializers.Serializer):
+    azure_device_ids = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        allow_empty=False,
+        max_length=10000,
+        help_text="Azure IoT Hub device IDs to provision (max 10000; existing ones are left as-is)"
+    )
+
+
+class AnomalyQuerySerializer(serializers.Serializer):
+    enqueued_from = serializers.DateTimeField(required=False, help_text="Scan readings from this time (inclusive)")
+    enqueued_to = serializers.DateTimeField(required=False, help_text="Scan readings before this time (exclusive)")
+    gap_minutes = serializers.FloatField(default=60, min_value=0, help_text="Report silences longer than this")
+    z_threshold = serializers.FloatField(default=4.0, min_value=0, help_text="Rolling z-score above which a void delta is an outlier")
+    window = serializers.IntegerField(default=48, min_value=2, max_value=10000, help_text="Readings in the rolling z-score window")
+
+
+class SeriesQuerySerializer(serializers.Serializer):
+    enqueued_from = serializers.DateTimeField(required=False, help_text="Chart readings from this time (inclusive)")
+    enqueued_to = serializers.DateTimeField(required=False, help_text="Chart readings before this time (exclusive)")
+    points = serializers.IntegerField(default=500, min_value=3, max_value=5000, help_text="Maximum points returned per series")
+    method = serializers.ChoiceField(choices=["avg", "lttb"], default="avg", help_text="avg = per-bucket means, lttb = Largest-Triangle-Three-Buckets")
+    field = serializers.ChoiceField(
+        choices=["round_count", "slim_count", "round_void_count", "slim_void_count"],
+        default="round_count",
+        help_text="Series LTTB selects points by (all series share the selected timestamps)"
+    )
@@ -0,0 +1,177 @@
+# azure_api/services/anomalies.py
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .resilience import execute
+from .supabase_client import supabase
+
+TABLE = "azure_data"
+SERIES_COLUMNS = "id, enqueued_at, round_count, slim_count, round_void_count, slim_void_count"
+COUNTERS = ("round_count", "slim_count")
+VOIDS = ("round_void_count", "slim_void_count")
+
+
+def stream_device_rows(azure_device_id, after=None, until=None, page_size=1000):
+    """
+    Yield pages of one device's rows in (enqueued_at, id) order using keyset
+    pagination, starting strictly after the (enqueued_at, id) watermark `after`.
+    """
+    cursor = after
+    while True:
+        query = supabase.table(TABLE).select(SERIES_COLUMNS).eq("azure_device_id", azure_device_id)
+        if cursor is not None:
+            ts, row_id = cursor
+            query = query.or_(f'enqueued_at.gt."{ts}",and(enqueued_at.eq."{ts}",id.gt.{row_id})')
+        if until is not None:
+            query = query.lt("enqueued_at", until)
+        res = execute(query.order("enqueued_at").order("id").limit(page_size))
+        if not res.data:
+            return
+        yield res.data
+        if len(res.data) < page_size:
+            return
+        last = res.data[-1]
+        cursor = (last["enqueued_at"], last["id"])
+
+
+def count_device_rows(azure_device_id, since=None, until=None):
+    """Exact row count for one device in [since, until), as a single HEAD request."""
+    from postgrest.types import CountMethod
+
+    query = supabase.table(TABLE).select("id", count=CountMethod.exact, head=True).eq("azure_device_id", azure_device_id)
+    if since is not None:
+        query = query.gte("enqueued_at", since)
+    if until is not None:
+        query = query.lt("enqueued_at", until)
+    return execute(query).count or 0
+
+
+def device_edge(azure_device_id, since=None, until=None, last=False):
+    """enqueued_at of one device's first (or last) row in [since, until), or None if there are none."""
+    query = supabase.table(TABLE).select("enqueued_at").eq("azure_device_id", azure_device_id)
+    if since is not None:
+        query = query.gte("enqueued_at", since)
+    if until is not None:
+        query = query.lt("enqueued_at", until)
+    res = execute(query.order("enqueued_at", desc=last).limit(1))
+    return res.data[0]["enqueued_at"] if res.data else None
+
+
+def to_columns(rows):
+    """Turn a page of row dicts into the float64 column arrays detect() works on."""
+    columns = {"id": np.fromiter((r["id"] for r in rows), np.int64, len(rows))}
+    columns["ts"] = np.fromiter((datetime.fromisoformat(r["enqueued_at"]).timestamp() for r in rows), float, len(rows))
+    for name in COUNTERS + VOIDS:
+        columns[name] = np.fromiter((float(r[name]) for r in rows), float, len(rows))
+    return columns
+
+
+def load_device_columns(azure_device_id, after=None, until=None, page_size=1000, max_rows=None, keep_enqueued_at=True):
+    """
+    Stream a device's rows page by page into column arrays, keeping only the
+    arrays (plus the enqueued_at strings, for reporting) rather than row dicts.
+    """
+    pages = []
+    enqueued_at = []
+    total = 0
+    for rows in stream_device_rows(azure_device_id, after=after, until=until, page_size=page_size):
+        pages.append(to_columns(rows))
+        if keep_enqueued_at:
+            enqueued_at.extend(r["enqueued_at"] for r in rows)
+        total += len(rows)
+        if max_rows and total >= max_rows:
+            break
+    if not pages:
+        return None, []
+    columns = {name: np.concatenate([p[name] for p in pages]) for name in pages[0]}
+    return columns, enqueued_at
+
+
+def detect(columns, context=None, gap_seconds=3600, z_threshold=4.0, window=48):
+    """
+    Vectorized checks over one device's readings in enqueued_at order.
+
+    context carries the previous run's last reading and trailing void deltas so
+    that incremental runs see gaps/deltas across the watermark boundary.
+    Returns (findings, new_context); each finding's "index" refers to columns.
+    """
+    n = len(columns["ts"])
+    if n == 0:
+        return [], context
+    context = context or {}
+    last = context.get("last")
+    offset = 1 if last else 0
+
+    def full(name):
+        return np.concatenate(([last[name]], columns[name])) if last else columns[name]
+
+    findings = []
+    ts = full("ts")
+    gaps = np.nonzero(np.diff(ts) > gap_seconds)[0]
+    for i, gap in zip(gaps, np.diff(ts)[gaps]):
+        findings.append({"type": "gap", "index": int(i + 1 - offset), "gap_minutes": round(float(gap) / 60, 1)})
+
+    for name in COUNTERS:
+        deltas = np.diff(full(name))
+        for i in np.nonzero(deltas < 0)[0]:
+            findings.append({"type": "negative_delta", "index": int(i + 1 - offset), "field": name, "delta": float(deltas[i])})
+
+    history = context.get("void_deltas", {})
+    new_history = {}
+    for name in VOIDS:
+        prior = np.asarray(history.get(name, []), dtype=float)
+        deltas = np.concatenate((prior, np.diff(full(name))))
+        if len(deltas) > window:
+            windows = sliding_window_view(deltas[:-1], window)
+            mean = windows.mean(axis=1)
+            std = windows.std(axis=1)
+            current = deltas[window:]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                z = np.where(std > 0, (current - mean) / std, 0.0)
+            for j in np.nonzero(np.abs(z) > z_threshold)[0]:
+                k = j + window
+                if k < len(prior):
+                    continue  # already judged in the previous run
+                # delta k - len(prior) ends at full row k - len(prior) + 1
+                index = int(k - len(prior) + 1 - offset)
+                findings.append({"type": "void_outlier", "index": index, "field": name, "z_score": round(float(z[j]), 2)})
+        new_history[name] = deltas[-window:].tolist()
+
+    new_context = {
+        "last": {name: float(columns[name][-1]) for name in ("ts",) + COUNTERS + VOIDS},
+        "void_deltas": new_history,
+    }
+    findings.sort(key=lambda f: f["index"])
+    return findings, new_context
+
+
+def describe(findings, columns, enqueued_at, azure_device_id):
+    """Attach row identity to findings from detect()."""
+    for finding in findings:
+        index = finding.pop("index")
+        finding.update({"azure_device_id": azure_device_id, "id": int(columns["id"][index]), "enqueued_at": enqueued_at[index]})
+    return findings
+
+
+class WatermarkStore:
+    """Per-device watermark and detector context persisted as one JSON file."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def load(self):
+        try:
+            return json.loads(self.path.read_text())
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save(self, state):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state))
+        os.replace(tmp, self.path)
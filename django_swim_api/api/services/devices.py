@@ -0,0 +1,124 @@
+# azure_api/services/devices.py
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+
+from django.conf import settings
+
+from .resilience import execute
+from .supabase_client import supabase
+
+DEVICES_TABLE = "devices"
+
+# Keep `in.(...)` filters well under URL length limits
+LOOKUP_CHUNK = 200
+UPSERT_CHUNK = 500
+
+
+class DeviceCache:
+    """
+    In-process azure_device_id -> devices.id map with a TTL and LRU eviction.
+    Only positive results are cached, so a device provisioned after a miss is
+    picked up on the next lookup.
+    """
+
+    def __init__(self, ttl=300.0, max_size=100_000, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys):
+        now = self.clock()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] > now:
+                    self._entries.move_to_end(key)
+                    found[key] = entry[0]
+                    self.hits += 1
+                else:
+                    if entry is not None:
+                        del self._entries[key]
+                    self.misses += 1
+        return found
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def set_many(self, mapping):
+        expires = self.clock() + self.ttl
+        with self._lock:
+            for key, value in mapping.items():
+                self._entries[key] = (value, expires)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+device_cache = DeviceCache(
+    ttl=getattr(settings, "DEVICE_CACHE_TTL_SECONDS", 300),
+    max_size=getattr(settings, "DEVICE_CACHE_MAX_SIZE", 100_000),
+)
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def resolve_device_ids(azure_device_ids, timer=nullcontext):
+    """
+    Map azure_device_ids to devices.id, serving from the cache and batching
+    misses into chunked lookups. `timer` wraps each lookup that reaches
+    Supabase (e.g. LoadShedder.timed), so cache hits don't count as latency.
+    """
+    wanted = list(dict.fromkeys(azure_device_ids))
+    found = device_cache.get_many(wanted)
+    missing = [d for d in wanted if d not in found]
+    for chunk in _chunks(missing, LOOKUP_CHUNK):
+        with timer():
+            res = execute(supabase.table(DEVICES_TABLE).select("id, azure_device_id").in_("azure_device_id", chunk))
+        fetched = {row["azure_device_id"]: row["id"] for row in res.data}
+        device_cache.set_many(fetched)
+        found.update(fetched)
+    return found
+
+
+def provision_devices(azure_device_ids):
+    """
+    Idempotently create devices in chunked upserts (ON CONFLICT DO NOTHING).
+    Returns (mapping of every requested azure_device_id -> id, number newly created).
+    The mapping is written straight into the device cache so the first
+    telemetry from a new device never pays for a cold lookup.
+    """
+    wanted = list(dict.fromkeys(azure_device_ids))
+    mapping = {}
+    for chunk in _chunks(wanted, UPSERT_CHUNK):
+        res = execute(
+            supabase.table(DEVICES_TABLE).upsert(
+                [{"azure_device_id": d} for d in chunk],
+                on_conflict="azure_device_id",
+                ignore_duplicates=True,
+            )
+        )
+        mapping.update({row["azure_device_id"]: row["id"] for row in res.data})
+    created = len(mapping)
+    device_cache.set_many(mapping)
+    # Rows that already existed aren't returned by DO NOTHING; resolve those separately
+    existing = [d for d in wanted if d not in mapping]
+    if existing:
+        mapping.update(resolve_device_ids(existing))
+    return mapping, created
@@ -0,0 +1,230 @@
+# azure_api/services/eventgrid.py
+import base64
+import json
+import mmap
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is used when orjson isn't installed
+    orjson = None
+
+TELEMETRY_EVENT = "Microsoft.Devices.DeviceTelemetry"
+
+loads = orjson.loads if orjson is not None else json.loads
+
+
+def decode_body(body):
+    """Event Grid delivers IoT Hub telemetry bodies base64-encoded; JSON-routed hubs send an object."""
+    if isinstance(body, dict):
+        return body
+    return loads(base64.b64decode(body))
+
+
+def event_to_reading(event):
+    """
+    Map a DeviceTelemetry event to an azure_data row, mirroring the Edge
+    Function's fallbacks. Returns None for non-telemetry events.
+    """
+    if event.get("eventType") != TELEMETRY_EVENT:
+        return None
+    data = event.get("data") or {}
+    system = data.get("systemProperties") or {}
+    decoded = decode_body(data.get("body"))
+    state = decoded.get("state") or {}
+    return {
+        "azure_device_id": system.get("iothub-connection-device-id") or decoded.get("deviceId") or "unknown-device",
+        "enqueued_at": system.get("iothub-enqueuedtime") or decoded.get("utc") or event.get("eventTime"),
+        "round_count": state.get("totalRoundCount") or 0,
+        "slim_count": state.get("totalSlimCount") or 0,
+        "round_void_count": state.get("totalVoidRoundMl") or 0,
+        "slim_void_count": state.get("totalVoidSlimMl") or 0,
+        "raw_payload": decoded,
+    }
+
+
+class DecodeResult:
+    """Readings decoded from a batch, plus counts of skipped events and (line, message) errors."""
+
+    def __init__(self, readings=None, ignored=0, errors=None):
+        self.readings = readings if readings is not None else []
+        self.ignored = ignored
+        self.errors = errors if errors is not None else []
+
+    def merge(self, other):
+        self.readings.extend(other.readings)
+        self.ignored += other.ignored
+        self.errors.extend(other.errors)
+        return self
+
+
+def _decode_event_batch(events, line_number=None):
+    result = DecodeResult()
+    for event in events:
+        try:
+            reading = event_to_reading(event)
+        except (ValueError, TypeError, AttributeError) as e:
+            event_id = event.get("id", "?") if isinstance(event, dict) else "?"
+            result.errors.append((line_number, f"undecodable event {event_id}: {e}"))
+            continue
+        if reading is None:
+            result.ignored += 1
+        else:
+            result.readings.append(reading)
+    return result
+
+
+def decode_events(events):
+    """Decode already-parsed events inline."""
+    return _decode_event_batch(events)
+
+
+def decode_request(raw, part=0, parts=1):
+    """
+    Parse one raw webhook body (an event or an array of events) and decode
+    slice `part` of `parts`. Pool workers each take a slice of the same raw
+    bytes, so the parent neither parses the body nor pickles event dicts.
+    """
+    try:
+        parsed = loads(raw)
+    except ValueError as e:
+        return DecodeResult(errors=[(None, f"invalid JSON: {e}")] if part == 0 else [])
+    events = parsed if isinstance(parsed, list) else [parsed]
+    return _decode_event_batch(events[len(events) * part // parts:len(events) * (part + 1) // parts])
+
+
+def decode_lines(lines):
+    """
+    Decode (line_number, raw_bytes) capture lines: parse each line (one event or
+    an array of events) and transform its telemetry. Runs in pool workers, so the
+    parent never parses JSON itself.
+    """
+    result = DecodeResult()
+    for line_number, raw in lines:
+        try:
+            parsed = loads(raw)
+        except ValueError as e:
+            result.errors.append((line_number, f"invalid JSON: {e}"))
+            continue
+        result.merge(_decode_event_batch(parsed if isinstance(parsed, list) else [parsed], line_number))
+    return result
+
+
+class DecodePipeline:
+    """
+    Batched decode stage that fans large inputs out to a process pool, since
+    base64 + JSON decoding is CPU-bound and would serialize on the GIL. Work
+    crosses to the workers as raw bytes: pickling parsed events out and
+    readings back costs the parent more than decoding them inline.
+
+    Webhook bodies smaller than inline_bytes are decoded in-process. Even
+    raw-in, the parent still unpickles every reading (~26 ms per 5,000 events
+    against ~32 ms to decode them inline), so the default keeps every body
+    Event Grid can deliver (1 MB max) inline; lower it only where
+    `manage.py bench_decode` shows the pool winning on the target cores.
+    """
+
+    def __init__(self, workers=None, inline_bytes=8 * 1024 * 1024, chunk_size=1024):
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.inline_bytes = inline_bytes
+        self.chunk_size = chunk_size
+        self._pool = None
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers)
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def decode_request(self, raw):
+        """Decode one raw webhook body, split across the pool when it is large enough to pay."""
+        if self.workers <= 1 or len(raw) < self.inline_bytes:
+            return decode_request(raw)
+        result = DecodeResult()
+        parts = self.workers
+        for part in self.pool.map(decode_request, [raw] * parts, range(parts), [parts] * parts):
+            result.merge(part)
+        return result
+
+    def imap_lines(self, lines):
+        """
+        Decode a stream of (line_number, raw_bytes) in chunks, yielding one
+        DecodeResult per chunk in input order. At most 2 * workers chunks are
+        in flight, so memory stays bounded however long the stream is.
+        """
+        if self.workers <= 1:
+            chunk = []
+            for line in lines:
+                chunk.append(line)
+                if len(chunk) >= self.chunk_size:
+                    yield decode_lines(chunk)
+                    chunk = []
+            if chunk:
+                yield decode_lines(chunk)
+            return
+
+        in_flight = deque()
+        chunk = []
+        for line in lines:
+            chunk.append(line)
+            if len(chunk) >= self.chunk_size:
+                in_flight.append(self.pool.submit(decode_lines, chunk))
+                chunk = []
+                if len(in_flight) >= 2 * self.workers:
+                    yield in_flight.popleft().result()
+        if chunk:
+            in_flight.append(self.pool.submit(decode_lines, chunk))
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def iter_capture_lines(path):
+    """Stream (line_number, raw_bytes) from a JSONL capture via mmap, without loading the file."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = 0
+            line_number = 0
+            while pos < size:
+                end = mm.find(b"\n", pos)
+                if end == -1:
+                    end = size
+                line = mm[pos:end]
+                pos = end + 1
+                line_number += 1
+                if line.strip():
+                    yield line_number, line
+
+
+def iter_capture_events(path, on_error=None):
+    """
+    Stream events from a JSONL capture. Each line is either one event or a
+    webhook body (array of events). Yields (line_number, event). Malformed
+    lines raise ValueError unless on_error(line_number, exc) is given, in
+    which case they are skipped.
+    """
+    for line_number, line in iter_capture_lines(path):
+        try:
+            parsed = loads(line)
+        except ValueError as e:
+            if on_error is None:
+                raise
+            on_error(line_number, e)
+            continue
+        for event in parsed if isinstance(parsed, list) else [parsed]:
+            yield line_number, event
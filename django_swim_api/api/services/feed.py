@@ -0,0 +1,107 @@
+# azure_api/services/feed.py
+import asyncio
+import threading
+from collections import deque
+
+from django.conf import settings
+
+
+class Subscription:
+    """One live-feed client: a bounded queue on the client's event loop."""
+
+    def __init__(self, broker, loop, azure_device_ids=None, maxsize=256):
+        self.broker = broker
+        self.loop = loop
+        self.azure_device_ids = set(azure_device_ids) if azure_device_ids else None
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = False
+
+    def wants(self, record):
+        return self.azure_device_ids is None or record.get("azure_device_id") in self.azure_device_ids
+
+    def _offer(self, entry):
+        # Runs on the subscriber's loop. A full buffer means the client isn't
+        # keeping up; drop it rather than buffering without bound.
+        if self.dropped:
+            return
+        try:
+            self.queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self.dropped = True
+            self.broker.unsubscribe(self)
+
+    async def get(self, timeout):
+        """Next (seq, record) entry, or None after timeout seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def drain(self):
+        entries = []
+        while not self.queue.empty():
+            entries.append(self.queue.get_nowait())
+        return entries
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    """
+    In-process pub/sub fan-out. The ingest path publishes each stored reading
+    once; every connected viewer gets it from memory instead of polling Supabase.
+    Each reading gets a sequence number and a short history is kept so clients
+    can resume (SSE Last-Event-ID, long-poll ?after=) without gaps.
+    """
+
+    def __init__(self, buffer_size=256, history_size=1024):
+        self.buffer_size = buffer_size
+        self._recent = deque(maxlen=history_size)
+        self._seq = 0
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, azure_device_ids=None):
+        sub = Subscription(self, asyncio.get_running_loop(), azure_device_ids, self.buffer_size)
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.discard(sub)
+                if sub.dropped:
+                    self.dropped += 1
+
+    def publish(self, record):
+        """Safe to call from sync views/threads; delivery happens on each subscriber's loop."""
+        with self._lock:
+            self._seq += 1
+            entry = (self._seq, record)
+            self._recent.append(entry)
+            subscribers = [s for s in self._subscribers if s.wants(record)]
+            self.published += 1
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub._offer, entry)
+            except RuntimeError:  # subscriber's loop already closed
+                self.unsubscribe(sub)
+
+    def since(self, seq, sub=None):
+        """Buffered entries newer than seq (matching sub's device filter, if given)."""
+        with self._lock:
+            return [(n, r) for n, r in self._recent if n > seq and (sub is None or sub.wants(r))]
+
+    def stats(self):
+        with self._lock:
+            return {"subscribers": len(self._subscribers), "published": self.published, "dropped": self.dropped, "last_seq": self._seq}
+
+
+broker = Broker(
+    buffer_size=getattr(settings, "LIVE_FEED_BUFFER", 256),
+    history_size=getattr(settings, "LIVE_FEED_HISTORY", 1024),
+)
@@ -0,0 +1,26 @@
+# azure_api/services/ingest.py
+from .devices import resolve_device_ids
+from .resilience import execute
+from .supabase_client import supabase
+
+TABLE = "azure_data"
+
+
+def bulk_insert_readings(readings):
+    """
+    Resolve device ids for a batch of readings (via the device cache) and store
+    them with a single insert. Readings for unregistered devices are skipped.
+    Returns (inserted_count, skipped_readings).
+    """
+    device_ids = resolve_device_ids(r["azure_device_id"] for r in readings)
+    rows = []
+    skipped = []
+    for reading in readings:
+        device_id = device_ids.get(reading["azure_device_id"])
+        if device_id is None:
+            skipped.append(reading)
+        else:
+            rows.append(dict(reading, device_id=device_id))
+    if rows:
+        execute(supabase.table(TABLE).insert(rows), idempotent=False)
+    return len(rows), skipped
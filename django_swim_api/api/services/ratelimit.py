@@ -0,0 +1,159 @@
+# azure_api/services/ratelimit.py
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class LocalBucketStore:
+    """In-process token buckets keyed by device. Buckets that have refilled are pruned."""
+
+    def __init__(self, max_keys=100_000):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key, rate, burst, now=None):
+        """Take one token from key's bucket. Returns 0 if allowed, else seconds until a token is available."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / rate
+            if len(self._buckets) > self.max_keys:
+                self._prune(rate, burst, now)
+            return wait
+
+    def _prune(self, rate, burst, now):
+        full_after = burst / rate
+        stale = [k for k, (_, updated) in self._buckets.items() if now - updated >= full_after]
+        for k in stale:
+            del self._buckets[k]
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore:
+    """
+    Token buckets kept in a Django cache so all workers share one limit per device.
+    Read-modify-write is not atomic across workers; under contention a device may
+    briefly get slightly more than its rate, which is acceptable for flood protection.
+    """
+
+    def __init__(self, alias, prefix="ingest-bucket:"):
+        self.cache = caches[alias]
+        self.prefix = prefix
+
+    def consume(self, key, rate, burst, now=None):
+        now = time.time() if now is None else now
+        cache_key = self.prefix + key
+        tokens, updated = self.cache.get(cache_key) or (burst, now)
+        tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0.0
+        else:
+            wait = (1 - tokens) / rate
+        self.cache.set(cache_key, (tokens, now), timeout=math.ceil(burst / rate) + 1)
+        return wait
+
+
+class DeviceRateLimiter:
+    """Token-bucket limiter keyed by azure_device_id."""
+
+    def __init__(self, rate, burst, store):
+        self.rate = rate
+        self.burst = burst
+        self.store = store
+
+    def check(self, azure_device_id):
+        """Returns 0 if the device may proceed, else the number of seconds to wait."""
+        if self.rate <= 0:
+            return 0.0
+        return self.store.consume(str(azure_device_id), self.rate, self.burst)
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Backend overloaded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class LoadShedder:
+    """
+    Concurrency-based load shedding driven by backend latency.
+
+    Admits up to max_concurrency in-flight requests while the EWMA of Supabase
+    call latency stays under target_latency; as latency climbs the admitted
+    concurrency shrinks proportionally, so a slow backend sheds load instead of
+    piling up blocked workers.
+    """
+
+    def __init__(self, max_concurrency, target_latency, alpha=0.2):
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.alpha = alpha
+        self.latency = 0.0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def allowed_concurrency(self):
+        if self.latency <= self.target_latency:
+            return self.max_concurrency
+        return max(1, int(self.max_concurrency * self.target_latency / self.latency))
+
+    def observe(self, seconds):
+        with self._lock:
+            if self.latency == 0.0:
+                self.latency = seconds
+            else:
+                self.latency += self.alpha * (seconds - self.latency)
+
+    @contextmanager
+    def admit(self):
+        with self._lock:
+            if self.in_flight >= self.allowed_concurrency():
+                raise Overloaded(max(1, math.ceil(self.latency)))
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    @contextmanager
+    def timed(self):
+        """Record the duration of a backend call in the latency average."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - started)
+
+
+def _build_limiter():
+    alias = getattr(settings, "INGEST_RATE_LIMIT_CACHE", "")
+    store = CacheBucketStore(alias) if alias else LocalBucketStore()
+    return DeviceRateLimiter(
+        rate=getattr(settings, "INGEST_DEVICE_RATE", 5.0),
+        burst=getattr(settings, "INGEST_DEVICE_BURST", 20),
+        store=store,
+    )
+
+
+device_limiter = _build_limiter()
+
+ingest_shedder = LoadShedder(
+    max_concurrency=getattr(settings, "INGEST_MAX_CONCURRENCY", 32),
+    target_latency=getattr(settings, "INGEST_LATENCY_TARGET_MS", 500) / 1000,
+)
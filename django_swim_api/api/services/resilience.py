@@ -0,0 +1,170 @@
+# azure_api/services/resilience.py
+import random
+import threading
+import time
+
+from django.conf import settings
+
+# PostgREST codes meaning "couldn't reach/use the database" rather than a bad request
+TRANSIENT_POSTGREST_CODES = {"PGRST000", "PGRST001", "PGRST002", "PGRST003"}
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling Supabase while the breaker is open."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Supabase circuit open, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def is_transient(exc):
+    """Network failures, gateway/5xx responses and PostgREST connection errors are worth retrying."""
+    # Imported here so loading this module (and api.views) doesn't pull in the Supabase HTTP stack
+    import httpx
+    from postgrest.exceptions import APIError
+
+    if isinstance(exc, httpx.TransportError):
+        return True
+    if isinstance(exc, APIError):
+        code = str(exc.code or "")
+        return code in TRANSIENT_POSTGREST_CODES or (code.isdigit() and code.startswith("5"))
+    return False
+
+
+def is_unsent(exc):
+    """Failures where the request never reached the server, so even writes are safe to resend."""
+    import httpx
+
+    return isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+
+
+class CircuitBreaker:
+    """
+    Classic closed/open/half-open breaker. After failure_threshold consecutive
+    transient failures it opens and rejects calls for reset_timeout seconds, then
+    lets a single probe through; success closes it, failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "successes": 0, "failures": 0, "rejected": 0, "retries": 0, "opened": 0}
+
+    def before_call(self):
+        with self._lock:
+            if self.state == self.OPEN:
+                elapsed = self.clock() - self.opened_at
+                if elapsed < self.reset_timeout:
+                    self.stats["rejected"] += 1
+                    raise CircuitOpen(max(1, int(self.reset_timeout - elapsed + 0.999)))
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    self.stats["rejected"] += 1
+                    raise CircuitOpen(1)
+                self._probe_in_flight = True
+            self.stats["calls"] += 1
+
+    def record_success(self):
+        with self._lock:
+            self.stats["successes"] += 1
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+            self.state = self.CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self.stats["failures"] += 1
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.stats["opened"] += 1
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+    def release(self):
+        """End a call that failed for non-transient reasons (bad request etc.) without tripping."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout": self.reset_timeout,
+                **self.stats,
+            }
+
+
+class RetryPolicy:
+    """Bounded retries with full-jitter exponential backoff."""
+
+    def __init__(self, attempts=3, base_delay=0.1, max_delay=2.0, sleep=time.sleep):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class ResilientExecutor:
+    def __init__(self, breaker, retry):
+        self.breaker = breaker
+        self.retry = retry
+
+    def execute(self, query, idempotent=True):
+        """
+        Run query.execute() through the breaker. Idempotent queries (selects,
+        updates/deletes by key) are retried on transient errors; inserts are only
+        retried when the request provably never left this process.
+        """
+        for attempt in range(self.retry.attempts):
+            self.breaker.before_call()
+            try:
+                res = query.execute()
+            except Exception as e:
+                if not is_transient(e):
+                    self.breaker.release()
+                    raise
+                self.breaker.record_failure()
+                last_attempt = attempt == self.retry.attempts - 1
+                if last_attempt or not (idempotent or is_unsent(e)):
+                    raise
+                self.breaker.stats["retries"] += 1
+                self.retry.sleep(self.retry.backoff(attempt))
+            else:
+                self.breaker.record_success()
+                return res
+
+
+supabase_breaker = CircuitBreaker(
+    failure_threshold=getattr(settings, "SUPABASE_BREAKER_FAILURES", 5),
+    reset_timeout=getattr(settings, "SUPABASE_BREAKER_RESET_SECONDS", 30.0),
+)
+
+supabase_executor = ResilientExecutor(
+    supabase_breaker,
+    RetryPolicy(
+        attempts=getattr(settings, "SUPABASE_RETRY_ATTEMPTS", 3),
+        base_delay=getattr(settings, "SUPABASE_RETRY_BASE_DELAY_MS", 100) / 1000,
+    ),
+)
+
+
+def execute(query, idempotent=True):
+    return supabase_executor.execute(query, idempotent=idempotent)
@@ -0,0 +1,215 @@
+# azure_api/services/series.py
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .anomalies import COUNTERS, VOIDS, count_device_rows, device_edge, stream_device_rows, to_columns
+
+FIELDS = COUNTERS + VOIDS
+# Row layout of the readings SeriesAccumulator keeps
+ROW = ("id", "ts") + FIELDS
+
+
+def bucket_average(columns, points):
+    """
+    Split the time range into `points` equal-width buckets and average every
+    field (and the timestamp) per bucket. Empty buckets are dropped, so gaps
+    in reporting stay visible instead of being interpolated.
+    """
+    ts = columns["ts"]
+    span = ts[-1] - ts[0]
+    if span <= 0:
+        index = np.zeros(len(ts), dtype=np.int64)
+    else:
+        index = np.minimum(((ts - ts[0]) / span * points).astype(np.int64), points - 1)
+    counts = np.bincount(index, minlength=points)
+    filled = counts > 0
+    result = {"ts": np.bincount(index, weights=ts, minlength=points)[filled] / counts[filled]}
+    for name in FIELDS:
+        result[name] = np.bincount(index, weights=columns[name], minlength=points)[filled] / counts[filled]
+    result["samples"] = counts[filled]
+    return result
+
+
+def lttb_indices(x, y, points):
+    """
+    Largest-Triangle-Three-Buckets: keep the first and last points and, from
+    each of the points - 2 buckets in between, the point forming the largest
+    triangle with the previously kept point and the next bucket's average.
+    Preserves peaks and resets that averaging would flatten.
+    """
+    n = len(x)
+    if points >= n:
+        return np.arange(n)
+    if points < 3:
+        return np.array([0, n - 1])[:points]
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    indices = np.empty(points, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = (edges[i + 1], edges[i + 2]) if i < points - 3 else (n - 1, n)
+        avg_x, avg_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        indices[i + 1] = a
+    return indices
+
+
+def lttb(columns, points, field="round_count"):
+    """Downsample every field at the rows LTTB picks for `field`, so all series share timestamps."""
+    indices = lttb_indices(columns["ts"], columns[field], points)
+    return {name: columns[name][indices] for name in ("ts",) + FIELDS}
+
+
+def downsample(columns, points, method="avg", field="round_count"):
+    if len(columns["ts"]) <= points:
+        return {name: columns[name] for name in ("ts",) + FIELDS}
+    if method == "lttb":
+        return lttb(columns, points, field)
+    return bucket_average(columns, points)
+
+
+class SeriesAccumulator:
+    """
+    Downsamples a series as pages arrive, in O(points) memory. Buckets are
+    equal-width over [t0, t1] and fixed up front, so pages may arrive in any
+    order (e.g. from concurrently read time slices). `avg` keeps per-bucket
+    sums; `lttb` keeps the min and max `field` reading of each of
+    ratio * points pre-buckets (MinMaxLTTB preselection), plus the first and
+    last readings, and runs LTTB over those. Until more than `points` readings
+    have been seen they are also kept raw, so short series come back unchanged.
+    """
+
+    def __init__(self, t0, t1, points, method="avg", field="round_count", ratio=4):
+        self.t0 = t0
+        self.span = t1 - t0
+        self.points = points
+        self.method = method
+        self.field = field
+        self.buckets = ratio * points if method == "lttb" else points
+        self.total = 0
+        self._raw = []
+        self._lock = threading.Lock()
+        if method == "lttb":
+            self._lo = np.full(self.buckets, np.inf)
+            self._hi = np.full(self.buckets, -np.inf)
+            self._lo_rows = np.zeros((len(ROW), self.buckets))
+            self._hi_rows = np.zeros((len(ROW), self.buckets))
+            self._ends = None
+        else:
+            self._counts = np.zeros(self.buckets, dtype=np.int64)
+            self._sums = np.zeros((len(ROW) - 1, self.buckets))
+
+    def _index(self, ts):
+        if self.span <= 0:
+            return np.zeros(len(ts), dtype=np.int64)
+        return np.clip(((ts - self.t0) / self.span * self.buckets).astype(np.int64), 0, self.buckets - 1)
+
+    def add(self, columns):
+        """Fold one page of to_columns() arrays into the buckets."""
+        rows = np.vstack([columns[name].astype(float) for name in ROW])
+        index = self._index(rows[1])
+        with self._lock:
+            self.total += rows.shape[1]
+            if self._raw is not None:
+                self._raw.append(rows)
+                if self.total > self.points:
+                    self._raw = None
+            if self.method == "lttb":
+                self._keep_extremes(index, rows)
+            else:
+                self._counts += np.bincount(index, minlength=self.buckets)
+                for i, values in enumerate(rows[1:]):
+                    self._sums[i] += np.bincount(index, weights=values, minlength=self.buckets)
+
+    def _keep_extremes(self, index, rows):
+        values = rows[ROW.index(self.field)]
+        order = np.lexsort((values, index))
+        grouped = index[order]
+        starts = np.flatnonzero(np.r_[True, grouped[1:] != grouped[:-1]])
+        buckets = grouped[starts]
+        lo, hi = order[starts], order[np.r_[starts[1:], len(order)] - 1]
+        take = values[lo] < self._lo[buckets]
+        self._lo[buckets[take]] = values[lo[take]]
+        self._lo_rows[:, buckets[take]] = rows[:, lo[take]]
+        take = values[hi] > self._hi[buckets]
+        self._hi[buckets[take]] = values[hi[take]]
+        self._hi_rows[:, buckets[take]] = rows[:, hi[take]]
+        ends = rows[:, [rows[1].argmin(), rows[1].argmax()]]
+        if self._ends is not None:
+            ends = np.hstack([self._ends, ends])
+        self._ends = ends[:, [ends[1].argmin(), ends[1].argmax()]]
+
+    @staticmethod
+    def _columns(rows):
+        rows = rows[:, np.lexsort((rows[0], rows[1]))]
+        return {name: rows[i] for i, name in enumerate(ROW)}
+
+    def result(self):
+        """The downsampled series, shaped like downsample()'s output."""
+        with self._lock:
+            if self._raw is not None:
+                rows = np.hstack(self._raw) if self._raw else np.zeros((len(ROW), 0))
+                columns = self._columns(rows)
+                return {name: columns[name] for name in ("ts",) + FIELDS}
+            if self.method == "lttb":
+                rows = np.hstack([self._lo_rows[:, np.isfinite(self._lo)], self._hi_rows[:, np.isfinite(self._hi)], self._ends])
+                _, unique = np.unique(rows[0], return_index=True)
+                return lttb(self._columns(rows[:, unique]), self.points, self.field)
+            filled = self._counts > 0
+            counts = self._counts[filled]
+            series = {name: self._sums[i][filled] / counts for i, name in enumerate(ROW[1:])}
+            series["samples"] = counts
+            return series
+
+
+def _read_slice(accumulator, azure_device_id, since, until, page_size):
+    # (since, 0) as the keyset cursor means enqueued_at >= since
+    after = (since, 0) if since else None
+    for rows in stream_device_rows(azure_device_id, after=after, until=until, page_size=page_size):
+        accumulator.add(to_columns(rows))
+
+
+def load_series(azure_device_id, points, method="avg", field="round_count", since=None, until=None, slices=8, page_size=1000):
+    """
+    Downsample one device's readings in [since, until) without holding them.
+    One concurrent round of count + first/last enqueued_at fixes the bucket
+    edges; the range is then read as up to `slices` equal time slices in
+    parallel, each keyset-paged, with every page folded into a
+    SeriesAccumulator as it arrives. Returns (series, raw_points).
+    """
+    with ThreadPoolExecutor(max(3, slices)) as pool:
+        total = pool.submit(count_device_rows, azure_device_id, since, until)
+        first = pool.submit(device_edge, azure_device_id, since, until)
+        last = pool.submit(device_edge, azure_device_id, since, until, last=True)
+        if not total.result() or first.result() is None or last.result() is None:
+            return None, 0
+        t0 = datetime.fromisoformat(first.result()).timestamp()
+        t1 = datetime.fromisoformat(last.result()).timestamp()
+        accumulator = SeriesAccumulator(t0, t1, points, method, field)
+        slices = 1 if t1 <= t0 else max(1, min(slices, math.ceil(total.result() / page_size)))
+        edges = [datetime.fromtimestamp(t0 + (t1 - t0) * k / slices, timezone.utc).isoformat() for k in range(1, slices)]
+        reads = [
+            pool.submit(_read_slice, accumulator, azure_device_id, lower, upper, page_size)
+            for lower, upper in zip([since] + edges, edges + [until])
+        ]
+        for read in reads:
+            read.result()
+    return accumulator.result(), accumulator.total
+
+
+def to_payload(series, decimals=3):
+    """Columnar JSON/MessagePack-friendly lists: one array per field, sharing enqueued_at."""
+    payload = {
+        "enqueued_at": [datetime.fromtimestamp(t, timezone.utc).isoformat() for t in series["ts"].tolist()],
+    }
+    for name in FIELDS:
+        payload[name] = np.round(series[name], decimals).tolist()
+    if "samples" in series:
+        payload["samples"] = series["samples"].tolist()
+    return payload
@@ -0,0 +1,176 @@
+# azure_api/services/spool.py
+import fcntl
+import json
+import mmap
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+ACTIVE_SUFFIX = ".open"
+SEALED_SUFFIX = ".jsonl"
+CHECKPOINT_FILE = "checkpoint.json"
+
+
+class Spool:
+    """
+    Append-only local spool for telemetry accepted while Supabase is unreachable.
+
+    Records are JSON lines appended to the active segment ``segment-N.open``.
+    Appends hit the page cache immediately and are fsynced in batches (every
+    fsync_batch records or fsync_interval seconds, whichever comes first), so a
+    crash can lose at most one unsynced batch. Segments are sealed (renamed to
+    ``.jsonl``) once they exceed segment_bytes or when a replay starts; only
+    sealed segments are replayed. A lock file serialises writers across worker
+    processes.
+    """
+
+    def __init__(self, directory, segment_bytes=64 * 1024 * 1024, fsync_batch=64, fsync_interval=0.2):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self._fd = None
+        self._active_path = None
+        self._pending = 0
+        self._timer = None
+        self._lock = threading.Lock()
+
+    # -- writing ---------------------------------------------------------
+
+    @contextmanager
+    def _locked(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.directory / "spool.lock", "a") as lockfile:
+            fcntl.flock(lockfile, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lockfile, fcntl.LOCK_UN)
+
+    def _segment_paths(self, suffix):
+        return sorted(self.directory.glob(f"segment-*{suffix}"))
+
+    def _next_seq(self):
+        seqs = [int(p.name.split("-")[1].split(".")[0]) for p in self.directory.glob("segment-*")]
+        return max(seqs, default=0) + 1
+
+    def _open_active(self):
+        """Reuse this process's fd unless another process sealed the segment out from under it."""
+        if self._fd is not None and self._active_path.exists():
+            return
+        self._close_fd()
+        active = self._segment_paths(ACTIVE_SUFFIX)
+        self._active_path = active[-1] if active else self.directory / f"segment-{self._next_seq():010d}{ACTIVE_SUFFIX}"
+        self._fd = os.open(self._active_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def _close_fd(self):
+        if self._fd is not None:
+            if self._pending:
+                os.fsync(self._fd)
+                self._pending = 0
+            os.close(self._fd)
+            self._fd = None
+
+    def append(self, record):
+        return self.extend([record])
+
+    def extend(self, records):
+        data = b"".join(json.dumps(r, separators=(",", ":")).encode() + b"\n" for r in records)
+        with self._locked():
+            self._open_active()
+            os.write(self._fd, data)
+            self._pending += len(records)
+            if self._pending >= self.fsync_batch:
+                os.fsync(self._fd)
+                self._pending = 0
+            elif self._timer is None:
+                self._timer = threading.Timer(self.fsync_interval, self.sync)
+                self._timer.daemon = True
+                self._timer.start()
+            if os.fstat(self._fd).st_size >= self.segment_bytes:
+                self._seal_active()
+        return len(records)
+
+    def sync(self):
+        with self._locked():
+            self._timer = None
+            if self._fd is not None and self._pending:
+                os.fsync(self._fd)
+                self._pending = 0
+
+    def _seal_active(self):
+        self._close_fd()
+        for path in self._segment_paths(ACTIVE_SUFFIX):
+            with open(path, "rb") as f:
+                os.fsync(f.fileno())
+            path.rename(path.with_suffix(SEALED_SUFFIX))
+
+    def seal(self):
+        """Close the active segment so it becomes eligible for replay."""
+        with self._locked():
+            self._seal_active()
+
+    # -- reading ---------------------------------------------------------
+
+    def sealed_segments(self):
+        return self._segment_paths(SEALED_SUFFIX)
+
+    @staticmethod
+    def read_segment(path, offset=0):
+        """Yield (end_offset, record) for each line after offset, reading via mmap."""
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size <= offset:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                pos = offset
+                while pos < size:
+                    end = mm.find(b"\n", pos)
+                    if end == -1:
+                        break  # torn final write; nothing after it was acknowledged as synced
+                    line = mm[pos:end]
+                    pos = end + 1
+                    if line.strip():
+                        yield pos, json.loads(line)
+
+    def load_checkpoint(self):
+        try:
+            return json.loads((self.directory / CHECKPOINT_FILE).read_text())
+        except (FileNotFoundError, ValueError):
+            return {"segment": None, "offset": 0}
+
+    def save_checkpoint(self, segment, offset):
+        tmp = self.directory / (CHECKPOINT_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"segment": segment, "offset": offset, "updated_at": time.time()}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.directory / CHECKPOINT_FILE)
+
+    def finish_segment(self, path):
+        path.unlink()
+        self.save_checkpoint(None, 0)
+
+    def stats(self):
+        segments = list(self.directory.glob("segment-*")) if self.directory.exists() else []
+        return {"segments": len(segments), "bytes": sum(p.stat().st_size for p in segments)}
+
+
+def _build_spool():
+    directory = getattr(settings, "INGEST_SPOOL_DIR", "")
+    if not directory:
+        return None
+    return Spool(
+        directory,
+        segment_bytes=int(getattr(settings, "INGEST_SPOOL_SEGMENT_MB", 64) * 1024 * 1024),
+        fsync_batch=getattr(settings, "INGEST_SPOOL_FSYNC_BATCH", 64),
+        fsync_interval=getattr(settings, "INGEST_SPOOL_FSYNC_INTERVAL_MS", 200) / 1000,
+    )
+
+
+# None when spooling is disabled (INGEST_SPOOL_DIR empty)
+spool = _build_spool()
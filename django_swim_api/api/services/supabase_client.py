@@ -1,14 +1,40 @@
 # azure_api/services/supabase_client.py
 import os
+import threading
 from dotenv import load_dotenv
-from supabase import create_client, Client
 
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise RuntimeError("Please set SUPABASE_URL and SUPABASE_KEY in your environment (.env)")
+_client = None
+_client_lock = threading.Lock()
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+def get_supabase():
+    """
+    Create the Supabase client on first use. Importing the `supabase` package
+    (auth, storage, realtime, httpx) costs a few hundred ms, which processes
+    that never query it (manage.py --help, cron commands that exit early)
+    shouldn't pay.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if not SUPABASE_URL or not SUPABASE_KEY:
+                    raise RuntimeError("Please set SUPABASE_URL and SUPABASE_KEY in your environment (.env)")
+                from supabase import create_client
+                _client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return _client
+
+
+class LazySupabase:
+    """Stands in for the client at import time; the first attribute access creates it."""
+
+    def __getattr__(self, name):
+        return getattr(get_supabase(), name)
+
+
+supabase = LazySupabase()
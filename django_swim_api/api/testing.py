@@ -0,0 +1,315 @@
+# azure_api/testing.py
+"""
+Offline stand-in for the Supabase PostgREST API.
+
+FakePostgrest is an httpx transport that serves the subset of PostgREST the
+views and services use (select/insert/upsert/update/delete with eq, in, range
+and keyset `or` filters, order, limit/offset, exact counts) from in-memory
+tables, and records every request so tests can assert round-trips and batch
+sizes. An optional per-request latency models real network cost, and fail()
+injects transport errors to exercise outage handling.
+"""
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+import httpx
+
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+OFFLINE_URL = "http://fake-postgrest.invalid"
+
+# Unique and NOT NULL constraints mirrored from the Supabase schema
+UNIQUE_COLUMNS = {"devices": "azure_device_id"}
+NOT_NULL_COLUMNS = {"azure_data": ("azure_device_id", "enqueued_at")}
+
+
+class UniqueViolation(Exception):
+    """A plain insert hit a unique column; served as PostgREST's 409 / 23505."""
+
+
+class NotNullViolation(Exception):
+    """An inserted row left a NOT NULL column empty; served as PostgREST's 400 / 23502."""
+
+
+def placeholder_client():
+    """
+    Make the shared Supabase client one for a placeholder project, for offline
+    runs without credentials: requests are served by FakePostgrest and never
+    leave the process.
+    """
+    from supabase import create_client
+    from .services import supabase_client
+
+    supabase_client._client = create_client(OFFLINE_URL, "offline")
+    return supabase_client._client
+
+
+class PostgrestCall(NamedTuple):
+    method: str
+    table: str
+    params: dict
+    batch: int  # rows in the request body (0 for reads)
+
+
+def _split_top_level(text):
+    """Split on commas outside parentheses and double quotes."""
+    parts, depth, quoted, current = [], 0, False, []
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(char)
+    if current:
+        parts.append("".join(current))
+    return parts
+
+
+def _unquote(value):
+    return value[1:-1] if len(value) >= 2 and value[0] == value[-1] == '"' else value
+
+
+def _coerce(value):
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = str(value)
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return text
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+OPERATORS = {
+    "eq": lambda a, b: a == b,
+    "neq": lambda a, b: a != b,
+    "gt": lambda a, b: a is not None and a > b,
+    "gte": lambda a, b: a is not None and a >= b,
+    "lt": lambda a, b: a is not None and a < b,
+    "lte": lambda a, b: a is not None and a <= b,
+}
+
+
+def _condition(column, expression):
+    """Predicate for one `column=op.value` filter."""
+    op, _, raw = expression.partition(".")
+    if op == "in":
+        wanted = {_coerce(_unquote(v)) for v in _split_top_level(raw.strip("()"))}
+        return lambda row: _coerce(row.get(column)) in wanted
+    if op == "is":
+        target = {"null": None, "true": True, "false": False}[raw]
+        return lambda row: row.get(column) is target
+    if op not in OPERATORS:
+        raise ValueError(f"FakePostgrest does not support operator {op!r}")
+    compare, value = OPERATORS[op], _coerce(_unquote(raw))
+    return lambda row: compare(_coerce(row.get(column)), value)
+
+
+def _logical(kind, body):
+    """Predicate for or=(...) / and=(...), including nested and(...) / or(...)."""
+    predicates = []
+    for part in _split_top_level(body[1:-1]):
+        if part.startswith(("and(", "or(")):
+            nested, _, rest = part.partition("(")
+            predicates.append(_logical(nested, "(" + rest))
+        else:
+            column, _, expression = part.partition(".")
+            predicates.append(_condition(column, expression))
+    combine = any if kind == "or" else all
+    return lambda row: combine(p(row) for p in predicates)
+
+
+class FakePostgrest(httpx.BaseTransport):
+    """In-memory PostgREST that records every request. See module docstring."""
+
+    def __init__(self, tables=None, latency=0.0, jitter=0.0, unique=None):
+        self.tables = {}
+        self.unique = UNIQUE_COLUMNS if unique is None else unique
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = []
+        self.network_time = 0.0
+        self._faults = []
+        self._next_id = {}
+        self._lock = threading.Lock()
+        for name, rows in (tables or {}).items():
+            self.seed(name, rows)
+
+    def seed(self, table, rows):
+        """Add rows to a table, assigning ids where missing; returns the stored rows."""
+        with self._lock:
+            return [self._add(table, row) for row in rows]
+
+    def rows(self, table):
+        return list(self.tables.get(table, []))
+
+    def calls_to(self, table=None, method=None):
+        return [c for c in self.calls if (table is None or c.table == table) and (method is None or c.method == method)]
+
+    def fail(self, method, table, error, times=None, after=0):
+        """Raise `error` (e.g. httpx.ReadTimeout) for matching requests, `times` times or forever, once `after` have succeeded."""
+        self._faults.append([method, table, error, times, after])
+
+    def reset_calls(self):
+        self.calls = []
+        self.network_time = 0.0
+
+    @contextmanager
+    def installed(self, client=None):
+        """Route the shared Supabase client's PostgREST requests through this fake."""
+        placeholder = False
+        if client is None:
+            from .services import supabase_client
+            if supabase_client._client is None and not (supabase_client.SUPABASE_URL and supabase_client.SUPABASE_KEY):
+                placeholder_client()
+                placeholder = True
+            client = supabase_client.supabase
+        postgrest = client.postgrest
+        original = postgrest.session
+        postgrest.session = httpx.Client(transport=self, headers=original.headers)
+        try:
+            yield self
+        finally:
+            postgrest.session.close()
+            postgrest.session = original
+            if placeholder:
+                supabase_client._client = None
+
+    def _add(self, table, row):
+        row = dict(row)
+        rows = self.tables.setdefault(table, [])
+        if "id" not in row:
+            self._next_id[table] = max(self._next_id.get(table, 0), max((r["id"] for r in rows), default=0)) + 1
+            row["id"] = self._next_id[table]
+        rows.append(row)
+        return row
+
+    def handle_request(self, request):
+        table = request.url.path.rstrip("/").rsplit("/", 1)[-1]
+        params = request.url.params
+        body = json.loads(request.content) if request.content else None
+        batch = len(body) if isinstance(body, list) else (1 if body else 0)
+        self.calls.append(PostgrestCall(request.method, table, dict(params.multi_items()), batch))
+
+        if self.latency or self.jitter:
+            delay = self.latency + random.uniform(0, self.jitter)
+            self.network_time += delay
+            time.sleep(delay)
+
+        for fault in self._faults:
+            method, fault_table, error, times, after = fault
+            if method == request.method and fault_table == table and times != 0:
+                if after:
+                    fault[4] -= 1
+                    continue
+                if times is not None:
+                    fault[3] -= 1
+                raise error
+
+        prefer = request.headers.get("prefer", "")
+        with self._lock:
+            if request.method == "POST":
+                try:
+                    status, result, matched = 201, self._insert(table, body, params, prefer), None
+                except UniqueViolation as e:
+                    return httpx.Response(409, json={
+                        "code": "23505",
+                        "message": f'duplicate key value violates unique constraint "{table}_{e.args[0]}_key"',
+                        "details": None,
+                        "hint": None,
+                    })
+                except NotNullViolation as e:
+                    return httpx.Response(400, json={
+                        "code": "23502",
+                        "message": f'null value in column "{e.args[0]}" of relation "{table}" violates not-null constraint',
+                        "details": None,
+                        "hint": None,
+                    })
+            else:
+                matched = self._select(table, params)
+                status, result = 200, matched
+                if request.method == "PATCH":
+                    for row in matched:
+                        row.update(body or {})
+                elif request.method == "DELETE":
+                    deleted = {id(row) for row in matched}
+                    self.tables[table] = [r for r in self.tables.get(table, []) if id(r) not in deleted]
+
+        headers = {"content-type": "application/json"}
+        if "count=" in prefer:
+            total = len(self._select(table, params, paginate=False)) if request.method in ("GET", "HEAD") else len(result)
+            headers["content-range"] = f"*/{total}" if not result else f"0-{len(result) - 1}/{total}"
+        if request.method == "HEAD" or (request.method != "GET" and "return=minimal" in prefer):
+            return httpx.Response(204 if request.method != "HEAD" else 200, headers=headers)
+
+        columns = params.get("select", "*").replace(" ", "")
+        if columns != "*":
+            names = columns.split(",")
+            result = [{k: row.get(k) for k in names} for row in result]
+        else:
+            result = [dict(row) for row in result]
+        if "vnd.pgrst.object" in request.headers.get("accept", ""):
+            if len(result) != 1:
+                return httpx.Response(406, json={"message": "JSON object requested, multiple (or no) rows returned", "code": "PGRST116"})
+            result = result[0]
+        return httpx.Response(status, json=result, headers=headers)
+
+    def _insert(self, table, body, params, prefer):
+        rows = body if isinstance(body, list) else [body]
+        for column in NOT_NULL_COLUMNS.get(table, ()):
+            if any(row.get(column) is None for row in rows):
+                raise NotNullViolation(column)
+        conflict = params.get("on_conflict")
+        unique = self.unique.get(table)
+        if unique and not conflict:
+            # plain INSERT: the whole statement fails on any duplicate, as in Postgres
+            taken = {r.get(unique) for r in self.tables.get(table, [])}
+            values = [row.get(unique) for row in rows]
+            if len(set(values)) != len(values) or taken.intersection(values):
+                raise UniqueViolation(unique)
+        inserted = []
+        for row in rows:
+            if conflict:
+                existing = next((r for r in self.tables.get(table, []) if r.get(conflict) == row.get(conflict)), None)
+                if existing is not None:
+                    if "resolution=merge-duplicates" in prefer:
+                        existing.update(row)
+                        inserted.append(existing)
+                    continue
+            inserted.append(self._add(table, row))
+        return inserted
+
+    def _select(self, table, params, paginate=True):
+        predicates = []
+        for key, value in params.multi_items():
+            if key in RESERVED_PARAMS:
+                continue
+            if key in ("or", "and"):
+                predicates.append(_logical(key, value))
+            else:
+                predicates.append(_condition(key, value))
+        rows = [r for r in self.tables.get(table, []) if all(p(r) for p in predicates)]
+
+        for term in reversed(params.get("order", "").split(",") if params.get("order") else []):
+            column, _, direction = term.partition(".")
+            rows.sort(key=lambda r: _coerce(r.get(column)), reverse=direction.startswith("desc"))
+        if paginate:
+            offset = int(params.get("offset", 0))
+            limit = params.get("limit")
+            rows = rows[offset:offset + int(limit)] if limit is not None else rows[offset:]
+        return rows
@@ -1,5 +1,6 @@
 
 import os
+import threading
 import time
 import uuid
 import json
@@ -82,3 +83,1046 @@ class EdgeFunctionIntegrationTest(TestCase):
 				found = True
 				break
 		self.assertTrue(found, f"Test device {test_device} not found in Django API response.")
+
+
+class ContentNegotiationTest(TestCase):
+	"""
+	MessagePack and gzip/zstd renderers/parsers used by the bulk endpoints.
+	"""
+	ROWS = [{"id": i, "azure_device_id": "Device-0001", "round_count": i, "enqueued_at": "2026-02-12T12:00:00Z"} for i in range(200)]
+
+	def _render(self, renderer, accept_encoding=""):
+		from rest_framework.response import Response
+		from rest_framework.test import APIRequestFactory
+		request = APIRequestFactory().get("/api/azure-data/", HTTP_ACCEPT_ENCODING=accept_encoding)
+		response = Response()
+		body = renderer.render(self.ROWS, renderer_context={"request": request, "response": response})
+		return body, response
+
+	def test_msgpack_roundtrip(self):
+		import msgpack
+		from .renderers import MessagePackRenderer
+		body = MessagePackRenderer().render(self.ROWS)
+		self.assertEqual(msgpack.unpackb(body), self.ROWS)
+
+	def test_json_compressed_when_accepted(self):
+		import gzip
+		from .renderers import CompressedJSONRenderer
+		body, response = self._render(CompressedJSONRenderer(), "gzip")
+		self.assertEqual(response["Content-Encoding"], "gzip")
+		self.assertIn("Accept-Encoding", response["Vary"])
+		self.assertEqual(json.loads(gzip.decompress(body)), self.ROWS)
+
+	def test_json_uncompressed_without_accept_encoding(self):
+		from .renderers import CompressedJSONRenderer
+		body, response = self._render(CompressedJSONRenderer())
+		self.assertFalse(response.has_header("Content-Encoding"))
+		self.assertEqual(json.loads(body), self.ROWS)
+
+	def test_choose_encoding_respects_q_values(self):
+		from .services.compression import choose_encoding
+		self.assertEqual(choose_encoding("gzip;q=1.0, zstd;q=0"), "gzip")
+		self.assertIsNone(choose_encoding("br, identity"))
+		self.assertIsNone(choose_encoding(""))
+
+	def test_gzip_request_body_is_inflated(self):
+		import gzip
+		from rest_framework.test import APIRequestFactory
+		from rest_framework.request import Request
+		from .parsers import DecompressingJSONParser
+		raw = gzip.compress(json.dumps(self.ROWS[0]).encode())
+		django_request = APIRequestFactory().post(
+			"/api/azure-data/", raw, content_type="application/json", HTTP_CONTENT_ENCODING="gzip"
+		)
+		request = Request(django_request, parsers=[DecompressingJSONParser()])
+		self.assertEqual(request.data, self.ROWS[0])
+
+	def test_decompress_enforces_size_limit(self):
+		import gzip
+		from .services.compression import decompress
+		with self.assertRaises(ValueError):
+			decompress(gzip.compress(b"0" * 4096), "gzip", max_size=1024)
+
+
+class IngestProtectionTest(TestCase):
+	"""
+	Per-device token bucket and latency-driven load shedding on ingest.
+	"""
+
+	def test_token_bucket_allows_burst_then_limits(self):
+		from .services.ratelimit import LocalBucketStore
+		store = LocalBucketStore()
+		waits = [store.consume("Device-0001", rate=1.0, burst=3, now=100.0) for _ in range(4)]
+		self.assertEqual(waits[:3], [0.0, 0.0, 0.0])
+		self.assertAlmostEqual(waits[3], 1.0)
+		# other devices are unaffected, and the bucket refills over time
+		self.assertEqual(store.consume("Device-0002", rate=1.0, burst=3, now=100.0), 0.0)
+		self.assertEqual(store.consume("Device-0001", rate=1.0, burst=3, now=101.5), 0.0)
+
+	def _isolate(self, **limits):
+		"""Fresh in-process buckets and shedder for the view, and the shared caches emptied."""
+		from unittest import mock
+		from django.core.cache import cache
+		from .services.devices import device_cache
+		from .services.ratelimit import DeviceRateLimiter, LoadShedder, LocalBucketStore
+		from .testing import FakePostgrest
+		from .throttling import DeviceIngestThrottle
+		cache.clear()
+		device_cache.clear()
+		self.shedder = LoadShedder(max_concurrency=limits.get("max_concurrency", 4), target_latency=0.1)
+		limiter = DeviceRateLimiter(rate=limits.get("rate", 1.0), burst=limits.get("burst", 2), store=LocalBucketStore())
+		self.fake = FakePostgrest({"devices": [{"azure_device_id": "Device-0001"}, {"azure_device_id": "Device-0002"}]})
+		for patcher in (mock.patch.object(DeviceIngestThrottle, "limiter", limiter), mock.patch("api.views.ingest_shedder", self.shedder), self.fake.installed()):
+			patcher.__enter__()
+			self.addCleanup(patcher.__exit__, None, None, None)
+
+	def _post(self, azure_device_id="Device-0001"):
+		reading = {"azure_device_id": azure_device_id, "round_count": 1, "slim_count": 2, "round_void_count": 1.5, "slim_void_count": 2.5, "enqueued_at": "2026-02-13T14:30:00Z"}
+		return self.client.post("/api/azure-data/", reading, content_type="application/json")
+
+	def test_device_over_its_rate_gets_429_with_retry_after(self):
+		self._isolate(rate=0.5, burst=2)
+		self.assertEqual([self._post().status_code for _ in range(2)], [201, 201])
+		response = self._post()
+		self.assertEqual(response.status_code, 429)
+		self.assertEqual(response["Retry-After"], "2")
+		self.assertEqual(len(self.fake.calls_to("azure_data", "POST")), 2)
+		# the limit is per device
+		self.assertEqual(self._post("Device-0002").status_code, 201)
+
+	def test_shed_request_gets_503_without_reaching_supabase(self):
+		self._isolate(max_concurrency=4)
+		self.shedder.observe(0.4)  # 4x the target latency: one request in flight at a time
+		with self.shedder.admit():
+			response = self._post()
+		self.assertEqual(response.status_code, 503)
+		self.assertEqual(response["Retry-After"], "1")
+		self.assertEqual(self.fake.calls, [])
+		self.assertEqual(self._post().status_code, 201)
+
+	def test_shedder_times_only_calls_that_reach_supabase(self):
+		self._isolate(rate=100.0, burst=100)
+		self.fake.latency = 0.02
+		for _ in range(4):
+			self.assertEqual(self._post().status_code, 201)
+		# one device lookup plus four inserts; the three cache hits add no samples
+		self.assertEqual(len(self.fake.calls), 5)
+		self.assertGreaterEqual(self.shedder.latency, 0.02)
+
+	def test_shedder_shrinks_concurrency_as_latency_climbs(self):
+		from .services.ratelimit import LoadShedder, Overloaded
+		shedder = LoadShedder(max_concurrency=4, target_latency=0.1)
+		self.assertEqual(shedder.allowed_concurrency(), 4)
+		shedder.observe(0.4)
+		self.assertEqual(shedder.allowed_concurrency(), 1)
+		with shedder.admit():
+			with self.assertRaises(Overloaded) as ctx:
+				with shedder.admit():
+					pass
+		self.assertGreaterEqual(ctx.exception.retry_after, 1)
+		self.assertEqual(shedder.in_flight, 0)
+
+
+class ResilienceTest(TestCase):
+	"""
+	Retry policy and circuit breaker wrapped around Supabase query execution.
+	"""
+
+	class FlakyQuery:
+		def __init__(self, failures, exc):
+			self.failures = failures
+			self.exc = exc
+			self.calls = 0
+
+		def execute(self):
+			self.calls += 1
+			if self.calls <= self.failures:
+				raise self.exc
+			return "ok"
+
+	def _executor(self, attempts=3, threshold=5):
+		from .services.resilience import CircuitBreaker, ResilientExecutor, RetryPolicy
+		breaker = CircuitBreaker(failure_threshold=threshold, reset_timeout=30)
+		return ResilientExecutor(breaker, RetryPolicy(attempts=attempts, sleep=lambda s: None)), breaker
+
+	def test_idempotent_query_retried_on_transient_error(self):
+		import httpx
+		executor, breaker = self._executor()
+		query = self.FlakyQuery(2, httpx.ReadTimeout("timed out"))
+		self.assertEqual(executor.execute(query), "ok")
+		self.assertEqual(query.calls, 3)
+		self.assertEqual(breaker.snapshot()["retries"], 2)
+
+	def test_insert_not_retried_after_request_was_sent(self):
+		import httpx
+		executor, _ = self._executor()
+		query = self.FlakyQuery(1, httpx.ReadTimeout("timed out"))
+		with self.assertRaises(httpx.ReadTimeout):
+			executor.execute(query, idempotent=False)
+		self.assertEqual(query.calls, 1)
+		# a connect failure means nothing was sent, so the write may be resent
+		query = self.FlakyQuery(1, httpx.ConnectError("refused"))
+		self.assertEqual(executor.execute(query, idempotent=False), "ok")
+
+	def test_client_errors_neither_retried_nor_counted(self):
+		from postgrest.exceptions import APIError
+		executor, breaker = self._executor()
+		query = self.FlakyQuery(1, APIError({"message": "bad column", "code": "42703"}))
+		with self.assertRaises(APIError):
+			executor.execute(query)
+		self.assertEqual(query.calls, 1)
+		self.assertEqual(breaker.snapshot()["failures"], 0)
+
+	def test_breaker_opens_then_fails_fast(self):
+		import httpx
+		from .services.resilience import CircuitOpen
+		executor, breaker = self._executor(attempts=1, threshold=2)
+		for _ in range(2):
+			with self.assertRaises(httpx.ConnectError):
+				executor.execute(self.FlakyQuery(1, httpx.ConnectError("down")))
+		self.assertEqual(breaker.state, breaker.OPEN)
+		query = self.FlakyQuery(0, None)
+		with self.assertRaises(CircuitOpen):
+			executor.execute(query)
+		self.assertEqual(query.calls, 0)
+
+	def test_half_open_probe_closes_breaker(self):
+		from .services.resilience import CircuitBreaker
+		now = [0.0]
+		breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+		breaker.before_call()
+		breaker.record_failure()
+		now[0] = 11.0
+		breaker.before_call()
+		self.assertEqual(breaker.state, breaker.HALF_OPEN)
+		breaker.record_success()
+		self.assertEqual(breaker.state, breaker.CLOSED)
+
+
+class SpoolTest(TestCase):
+	"""
+	Local durable spool used when Supabase is unreachable.
+	"""
+
+	def setUp(self):
+		import tempfile
+		from .services.spool import Spool
+		self.tmp = tempfile.TemporaryDirectory()
+		self.spool = Spool(self.tmp.name, segment_bytes=200, fsync_batch=2, fsync_interval=0.01)
+
+	def tearDown(self):
+		self.spool._close_fd()
+		self.tmp.cleanup()
+
+	def _replay(self):
+		return [r for seg in self.spool.sealed_segments() for _, r in self.spool.read_segment(seg)]
+
+	def test_segments_rotate_and_replay_in_order(self):
+		records = [{"azure_device_id": "Device-0001", "round_count": i} for i in range(10)]
+		for record in records:
+			self.spool.append(record)
+		self.spool.seal()
+		self.assertGreater(len(self.spool.sealed_segments()), 1)
+		self.assertEqual(self._replay(), records)
+
+	def test_checkpoint_resumes_mid_segment(self):
+		self.spool.extend([{"n": 1}, {"n": 2}, {"n": 3}])
+		self.spool.seal()
+		segment = self.spool.sealed_segments()[0]
+		first_end, _ = next(self.spool.read_segment(segment))
+		self.spool.save_checkpoint(segment.name, first_end)
+		checkpoint = self.spool.load_checkpoint()
+		self.assertEqual(checkpoint["segment"], segment.name)
+		rest = [r for _, r in self.spool.read_segment(segment, checkpoint["offset"])]
+		self.assertEqual(rest, [{"n": 2}, {"n": 3}])
+		self.spool.finish_segment(segment)
+		self.assertEqual(self.spool.sealed_segments(), [])
+		self.assertIsNone(self.spool.load_checkpoint()["segment"])
+
+	def test_torn_final_line_is_ignored(self):
+		self.spool.append({"n": 1})
+		self.spool.seal()
+		segment = self.spool.sealed_segments()[0]
+		with open(segment, "ab") as f:
+			f.write(b'{"n": 2')
+		self.assertEqual(self._replay(), [{"n": 1}])
+
+
+class SpoolIngestViewTest(TestCase):
+	"""
+	POST /api/azure-data/ spools readings only when the insert provably never reached Supabase.
+	"""
+
+	READING = {"azure_device_id": "Device-0001", "round_count": 1, "slim_count": 2, "round_void_count": 1.5, "slim_void_count": 2.5, "enqueued_at": "2026-02-13T14:30:00Z"}
+
+	def setUp(self):
+		import tempfile
+		from unittest import mock
+		from .services.devices import device_cache
+		from .services.ratelimit import LocalBucketStore, device_limiter
+		from .services.resilience import supabase_breaker, supabase_executor
+		from .services.spool import Spool
+		from .testing import FakePostgrest
+		device_cache.clear()
+		self.tmp = tempfile.TemporaryDirectory()
+		self.spool = Spool(self.tmp.name)
+		self.fake = FakePostgrest({"devices": [{"azure_device_id": "Device-0001"}]})
+		for patcher in (
+			mock.patch("api.views.spool", self.spool),
+			mock.patch.object(supabase_executor.retry, "sleep", lambda s: None),
+			mock.patch.object(device_limiter, "store", LocalBucketStore()),
+			self.fake.installed(),
+		):
+			patcher.__enter__()
+			self.addCleanup(patcher.__exit__, None, None, None)
+		self.addCleanup(supabase_breaker.record_success)
+		self.addCleanup(self.tmp.cleanup)
+		self.addCleanup(self.spool._close_fd)
+
+	def _post(self):
+		return self.client.post("/api/azure-data/", self.READING, content_type="application/json")
+
+	def _spooled(self):
+		self.spool.seal()
+		return [r for seg in self.spool.sealed_segments() for _, r in self.spool.read_segment(seg)]
+
+	def test_unsent_insert_is_spooled(self):
+		import httpx
+		self.fake.fail("POST", "azure_data", httpx.ConnectError("refused"))
+		response = self._post()
+		self.assertEqual(response.status_code, 202)
+		self.assertEqual(response.json()["status"], "spooled")
+		self.assertEqual([r["round_count"] for r in self._spooled()], [1])
+
+	def test_lookup_outage_is_spooled(self):
+		import httpx
+		self.fake.fail("GET", "devices", httpx.ReadTimeout("timed out"))
+		self.assertEqual(self._post().status_code, 202)
+		self.assertEqual(len(self._spooled()), 1)
+
+	def test_insert_timeout_is_not_spooled(self):
+		import httpx
+		# the row may already be committed; replaying it would duplicate it
+		self.fake.fail("POST", "azure_data", httpx.ReadTimeout("timed out"))
+		response = self._post()
+		self.assertEqual(response.status_code, 503)
+		self.assertEqual(self._spooled(), [])
+		self.assertEqual(len(self.fake.calls_to("azure_data", "POST")), 1)
+
+
+class ReplaySpoolCommandTest(TestCase):
+	"""
+	`manage.py replay_spool` drains sealed segments into Supabase with bulk inserts.
+	"""
+
+	def setUp(self):
+		import tempfile
+		from unittest import mock
+		from .services.devices import device_cache
+		from .services.resilience import supabase_breaker, supabase_executor
+		from .services.spool import Spool
+		from .testing import FakePostgrest
+		device_cache.clear()
+		self.tmp = tempfile.TemporaryDirectory()
+		self.spool = Spool(self.tmp.name)
+		self.fake = FakePostgrest({"devices": [{"azure_device_id": "Device-0001"}]})
+		for patcher in (
+			mock.patch("api.management.commands.replay_spool.spool", self.spool),
+			mock.patch.object(supabase_executor.retry, "sleep", lambda s: None),
+			self.fake.installed(),
+		):
+			patcher.__enter__()
+			self.addCleanup(patcher.__exit__, None, None, None)
+		self.addCleanup(supabase_breaker.record_success)
+		self.addCleanup(self.tmp.cleanup)
+		self.addCleanup(self.spool._close_fd)
+
+	def _spool(self, azure_device_ids):
+		self.spool.extend([
+			{"azure_device_id": d, "round_count": i, "slim_count": 0, "round_void_count": 0, "slim_void_count": 0, "enqueued_at": f"2026-01-01T00:00:{i:02d}+00:00"}
+			for i, d in enumerate(azure_device_ids)
+		])
+		self.spool.seal()
+
+	def _replay(self, *args):
+		import io
+		from django.core.management import call_command
+		stdout, stderr = io.StringIO(), io.StringIO()
+		call_command("replay_spool", *args, stdout=stdout, stderr=stderr)
+		return stdout.getvalue(), stderr.getvalue()
+
+	def _inserted(self):
+		return [r["round_count"] for r in self.fake.rows("azure_data")]
+
+	def test_replays_in_batches_and_deletes_finished_segments(self):
+		self._spool(["Device-0001"] * 5)
+		stdout, _ = self._replay("--batch-size", "2")
+		self.assertEqual(self._inserted(), [0, 1, 2, 3, 4])
+		self.assertEqual([c.batch for c in self.fake.calls_to("azure_data", "POST")], [2, 2, 1])
+		self.assertIn("Inserted 5 records", stdout)
+		self.assertEqual(self.spool.sealed_segments(), [])
+		self.assertIsNone(self.spool.load_checkpoint()["segment"])
+
+	def test_resumes_from_mid_segment_checkpoint(self):
+		self._spool(["Device-0001"] * 3)
+		segment = self.spool.sealed_segments()[0]
+		first_end, _ = next(self.spool.read_segment(segment))
+		self.spool.save_checkpoint(segment.name, first_end)
+		stdout, _ = self._replay()
+		self.assertIn(f"Resuming {segment.name} at byte {first_end}", stdout)
+		self.assertEqual(self._inserted(), [1, 2])
+
+	def test_failed_batch_keeps_checkpoint_for_rerun(self):
+		import httpx
+		from django.core.management.base import CommandError
+		self._spool(["Device-0001"] * 4)
+		segment = self.spool.sealed_segments()[0]
+		# the first batch commits; the second times out after it was sent and is not retried
+		self.fake.fail("POST", "azure_data", httpx.ReadTimeout("timed out"), times=1, after=1)
+		with self.assertRaisesMessage(CommandError, "checkpoint kept"):
+			self._replay("--batch-size", "2")
+		self.assertEqual(self._inserted(), [0, 1])
+		offsets = [end for end, _ in self.spool.read_segment(segment)]
+		checkpoint = self.spool.load_checkpoint()
+		self.assertEqual((checkpoint["segment"], checkpoint["offset"]), (segment.name, offsets[1]))
+		self.assertEqual(self.spool.sealed_segments(), [segment])
+
+		self._replay("--batch-size", "2")
+		self.assertEqual(self._inserted(), [0, 1, 2, 3])
+		self.assertEqual(self.spool.sealed_segments(), [])
+
+	def test_unknown_devices_are_skipped_and_reported(self):
+		self._spool(["Device-0001", "Device-9999", "Device-0001"])
+		stdout, stderr = self._replay()
+		self.assertEqual(self._inserted(), [0, 2])
+		self.assertIn("skipped 1 for unknown devices", stdout)
+		self.assertIn("Skipping record for unknown device: Device-9999", stderr)
+		self.assertEqual(self.spool.sealed_segments(), [])
+
+
+class BulkOperationSerializerTest(TestCase):
+	"""
+	Validation of filter-based bulk update/delete requests.
+	"""
+
+	def test_unscoped_filter_rejected(self):
+		from .serializers import AzureDataBulkFilterSerializer
+		serializer = AzureDataBulkFilterSerializer(data={"enqueued_from": "2026-01-01T00:00:00Z"})
+		self.assertFalse(serializer.is_valid())
+		self.assertIn("non_field_errors", serializer.errors)
+
+	def test_inverted_range_rejected(self):
+		from .serializers import AzureDataBulkFilterSerializer
+		serializer = AzureDataBulkFilterSerializer(data={
+			"azure_device_id": "Device-0001",
+			"enqueued_from": "2026-01-02T00:00:00Z",
+			"enqueued_to": "2026-01-01T00:00:00Z",
+		})
+		self.assertFalse(serializer.is_valid())
+
+	def test_update_requires_values(self):
+		from .serializers import AzureDataBulkUpdateSerializer
+		serializer = AzureDataBulkUpdateSerializer(data={"ids": [1, 2, 3], "set": {}})
+		self.assertFalse(serializer.is_valid())
+		serializer = AzureDataBulkUpdateSerializer(data={"ids": [1, 2, 3], "set": {"round_count": 0}, "dry_run": True})
+		self.assertTrue(serializer.is_valid(), serializer.errors)
+		self.assertTrue(serializer.validated_data["dry_run"])
+
+
+class DeviceCacheTest(TestCase):
+	"""
+	In-process azure_device_id -> devices.id cache fed by lookups and provisioning.
+	"""
+
+	def test_ttl_expiry_and_lru_eviction(self):
+		from .services.devices import DeviceCache
+		now = [0.0]
+		cache = DeviceCache(ttl=10, max_size=2, clock=lambda: now[0])
+		cache.set_many({"Device-0001": 1, "Device-0002": 2})
+		self.assertEqual(cache.get("Device-0001"), 1)
+		cache.set_many({"Device-0003": 3})  # evicts least recently used Device-0002
+		self.assertEqual(cache.get_many(["Device-0001", "Device-0002", "Device-0003"]), {"Device-0001": 1, "Device-0003": 3})
+		now[0] = 11.0
+		self.assertIsNone(cache.get("Device-0001"))
+		self.assertEqual(cache.stats()["size"], 1)
+
+
+class AnomalyDetectionTest(TestCase):
+	"""
+	Vectorized gap / negative delta / void outlier checks, including incremental runs.
+	"""
+
+	def _columns(self):
+		import numpy as np
+		n = 200
+		ts = np.arange(n) * 300.0
+		ts[100:] += 7200  # two-hour silence before row 100
+		counts = np.arange(n, dtype=float)
+		counts[150] = 0  # counter reset at row 150
+		voids = np.cumsum(1 + np.random.RandomState(0).rand(n) * 0.1)
+		voids[170:] += 50  # implausible void jump at row 170
+		return {"id": np.arange(n), "ts": ts, "round_count": counts, "slim_count": counts.copy(), "round_void_count": voids, "slim_void_count": voids.copy()}
+
+	def test_detects_gap_negative_delta_and_outlier(self):
+		from .services.anomalies import detect
+		findings, _ = detect(self._columns(), gap_seconds=3600)
+		found = {(f["type"], f["index"]) for f in findings}
+		self.assertEqual(found, {("gap", 100), ("negative_delta", 150), ("void_outlier", 170)})
+
+	def test_incremental_run_matches_full_scan(self):
+		from .services.anomalies import detect
+		columns = self._columns()
+		full, _ = detect(columns, gap_seconds=3600)
+		for cut in (100, 150, 170):
+			first, context = detect({k: v[:cut] for k, v in columns.items()}, gap_seconds=3600)
+			rest, _ = detect({k: v[cut:] for k, v in columns.items()}, context, gap_seconds=3600)
+			combined = [(f["type"], f["index"]) for f in first] + [(f["type"], f["index"] + cut) for f in rest]
+			self.assertEqual(sorted(combined), sorted((f["type"], f["index"]) for f in full))
+
+
+class DetectAnomaliesCommandTest(TestCase):
+	"""
+	Watermark handling of `manage.py detect_anomalies`.
+	"""
+
+	def test_full_rescan_keeps_other_devices_watermarks(self):
+		import io
+		import tempfile
+		from django.core.management import call_command
+		from django.test import override_settings
+		from .services.anomalies import WatermarkStore
+		from .testing import FakePostgrest
+		fake = FakePostgrest({"azure_data": [
+			{"azure_device_id": "Device-0001", "enqueued_at": f"2026-01-01T00:0{i}:00+00:00", "round_count": i, "slim_count": i, "round_void_count": 0, "slim_void_count": 0}
+			for i in range(5)
+		]})
+		with tempfile.TemporaryDirectory() as tmp, fake.installed():
+			store = WatermarkStore(f"{tmp}/state.json")
+			other = {"watermark": ["2026-01-01T00:00:00+00:00", 7], "context": {"last": {"ts": 0.0}}}
+			store.save({"Device-0001": {"watermark": ["2026-01-01T00:04:00+00:00", 5]}, "Device-0002": other})
+			with override_settings(ANOMALY_STATE_FILE=store.path):
+				call_command("detect_anomalies", "--full", "--device", "Device-0001", "--workers", "1", stdout=io.StringIO())
+			state = store.load()
+		self.assertEqual(state["Device-0002"], other)
+		self.assertEqual(state["Device-0001"]["watermark"], ["2026-01-01T00:04:00+00:00", 5])
+		# the stored watermark was ignored: all five rows were read
+		self.assertEqual(len(fake.calls_to("azure_data")), 1)
+		self.assertNotIn("or", fake.calls_to("azure_data")[0].params)
+
+	def test_workers_scan_devices_concurrently(self):
+		import io
+		import tempfile
+		from django.core.management import call_command
+		from django.test import override_settings
+		from .services.anomalies import WatermarkStore
+		from .testing import FakePostgrest
+		devices = [f"Device-{d:04d}" for d in range(1, 5)]
+		fake = FakePostgrest({"azure_data": [
+			{"azure_device_id": d, "enqueued_at": f"2026-01-01T00:0{i}:00+00:00", "round_count": i, "slim_count": i, "round_void_count": 0, "slim_void_count": 0}
+			for d in devices for i in range(3)
+		]}, latency=0.1)
+		args = [arg for d in devices for arg in ("--device", d)]
+		with tempfile.TemporaryDirectory() as tmp, fake.installed(), override_settings(ANOMALY_STATE_FILE=f"{tmp}/state.json"):
+			started = time.perf_counter()
+			call_command("detect_anomalies", *args, "--workers", "4", stdout=io.StringIO())
+			elapsed = time.perf_counter() - started
+			state = WatermarkStore(f"{tmp}/state.json").load()
+		# four one-page fetches of 100 ms each overlap instead of running back to back
+		self.assertEqual(len(fake.calls_to("azure_data")), 4)
+		self.assertLess(elapsed, 0.3)
+		self.assertEqual({d: state[d]["watermark"][0] for d in devices}, dict.fromkeys(devices, "2026-01-01T00:02:00+00:00"))
+
+
+class SeriesDownsamplingTest(TestCase):
+	"""
+	Bucket-average and LTTB downsampling behind the device series endpoint.
+	"""
+
+	def _columns(self, n=10000):
+		import numpy as np
+		ts = np.arange(n) * 60.0
+		counts = np.arange(n, dtype=float)
+		counts[7000] = 50000  # single-reading spike
+		voids = np.linspace(0, 100, n)
+		return {"id": np.arange(n), "ts": ts, "round_count": counts, "slim_count": counts.copy(), "round_void_count": voids, "slim_void_count": voids.copy()}
+
+	def test_bucket_average_is_bounded_and_preserves_totals(self):
+		from .services.series import bucket_average
+		columns = self._columns()
+		series = bucket_average(columns, 100)
+		self.assertEqual(len(series["ts"]), 100)
+		self.assertEqual(int(series["samples"].sum()), 10000)
+		self.assertAlmostEqual(float((series["round_void_count"] * series["samples"]).sum()), float(columns["round_void_count"].sum()), places=3)
+
+	def test_lttb_keeps_endpoints_and_spike(self):
+		from .services.series import lttb_indices
+		columns = self._columns()
+		indices = lttb_indices(columns["ts"], columns["round_count"], 200)
+		self.assertEqual(len(indices), 200)
+		self.assertEqual((indices[0], indices[-1]), (0, 9999))
+		self.assertIn(7000, indices.tolist())
+		self.assertTrue((indices[1:] > indices[:-1]).all())
+
+	def _accumulate(self, columns, points, method):
+		from .services.series import SeriesAccumulator
+		accumulator = SeriesAccumulator(columns["ts"][0], columns["ts"][-1], points, method)
+		# pages from concurrent slices arrive in any order
+		for start in (6000, 0, 9000, 3000):
+			accumulator.add({k: v[start:start + 3000] for k, v in columns.items()})
+		return accumulator
+
+	def test_streamed_buckets_match_in_memory_average(self):
+		import numpy as np
+		from .services.series import bucket_average
+		columns = self._columns()
+		accumulator = self._accumulate(columns, 100, "avg")
+		self.assertEqual(accumulator.total, 10000)
+		series, expected = accumulator.result(), bucket_average(columns, 100)
+		for name in expected:
+			self.assertTrue(np.allclose(series[name], expected[name]), name)
+
+	def test_streamed_lttb_keeps_endpoints_and_spike(self):
+		columns = self._columns()
+		series = self._accumulate(columns, 200, "lttb").result()
+		self.assertEqual(len(series["ts"]), 200)
+		self.assertEqual((series["ts"][0], series["ts"][-1]), (0.0, 9999 * 60.0))
+		self.assertIn(50000, series["round_count"].tolist())
+		self.assertTrue((series["ts"][1:] > series["ts"][:-1]).all())
+
+	def test_short_series_returned_unchanged(self):
+		from .services.series import downsample, to_payload
+		columns = {k: v[:50] for k, v in self._columns().items()}
+		payload = to_payload(downsample(columns, 500, "lttb"))
+		self.assertEqual(len(payload["enqueued_at"]), 50)
+		self.assertEqual(payload["round_count"][:3], [0.0, 1.0, 2.0])
+
+
+class LiveFeedBrokerTest(TestCase):
+	"""
+	In-process pub/sub fan-out behind the SSE / long-poll live feed.
+	"""
+
+	def test_fan_out_filters_by_device(self):
+		import asyncio
+		from .services.feed import Broker
+
+		async def scenario():
+			broker = Broker(buffer_size=8)
+			everything = broker.subscribe()
+			only_one = broker.subscribe(["Device-0001"])
+			broker.publish({"azure_device_id": "Device-0001", "round_count": 1})
+			broker.publish({"azure_device_id": "Device-0002", "round_count": 2})
+			await asyncio.sleep(0)
+			return everything.drain(), only_one.drain()
+
+		everything, only_one = asyncio.run(scenario())
+		self.assertEqual([seq for seq, _ in everything], [1, 2])
+		self.assertEqual([r["azure_device_id"] for _, r in only_one], ["Device-0001"])
+
+	def test_slow_consumer_is_dropped(self):
+		import asyncio
+		from .services.feed import Broker
+
+		async def scenario():
+			broker = Broker(buffer_size=2)
+			sub = broker.subscribe()
+			for i in range(3):
+				broker.publish({"azure_device_id": "Device-0001", "round_count": i})
+			await asyncio.sleep(0)
+			return broker, sub
+
+		broker, sub = asyncio.run(scenario())
+		self.assertTrue(sub.dropped)
+		self.assertEqual(broker.stats()["subscribers"], 0)
+		self.assertEqual(broker.stats()["dropped"], 1)
+
+	def test_history_allows_resume(self):
+		from .services.feed import Broker
+		broker = Broker(history_size=2)
+		for i in range(3):
+			broker.publish({"azure_device_id": "Device-0001", "round_count": i})
+		self.assertEqual([seq for seq, _ in broker.since(1)], [2, 3])
+		self.assertEqual([seq for seq, _ in broker.since(0)], [2, 3])  # seq 1 aged out
+
+
+class LiveFeedViewTest(TestCase):
+	"""
+	SSE and long-poll endpoints on top of the in-process broker.
+	"""
+
+	def test_sse_refused_under_wsgi(self):
+		response = self.client.get("/api/azure-data/live/")
+		self.assertEqual(response.status_code, 501)
+		self.assertIn("poll", response.json()["error"])
+
+	async def test_sse_streams_published_readings_under_asgi(self):
+		import asyncio
+		from django.test import AsyncClient
+		from .services.feed import broker
+		response = await AsyncClient().get("/api/azure-data/live/", {"azure_device_id": "Device-0042"})
+		self.assertEqual(response["Content-Type"], "text/event-stream")
+		chunks = aiter(response.streaming_content)
+		self.assertIn("retry:", (await anext(chunks)).decode())
+		reading = asyncio.ensure_future(anext(chunks))
+		await asyncio.sleep(0)  # let the stream subscribe and wait
+		broker.publish({"azure_device_id": "Device-0042", "round_count": 7})
+		event = (await asyncio.wait_for(reading, 2)).decode()
+		self.assertIn("event: reading", event)
+		self.assertIn('"round_count": 7', event)
+		await chunks.aclose()
+
+	async def test_long_poll_returns_buffered_readings(self):
+		from django.test import AsyncClient
+		from .services.feed import broker
+		after = broker.stats()["last_seq"]
+		broker.publish({"azure_device_id": "Device-0043", "round_count": 1})
+		response = await AsyncClient().get("/api/azure-data/live/poll/", {"after": after, "azure_device_id": "Device-0043", "timeout": 1})
+		self.assertEqual([r["round_count"] for r in response.json()["readings"]], [1])
+		self.assertEqual(response.json()["after"], after + 1)
+
+
+class EventGridEvents:
+	"""Builds IoT Hub DeviceTelemetry events as Event Grid delivers them."""
+
+	def _event(self, device="Device-0001", round_count=42):
+		import base64
+		body = {
+			"deviceId": device,
+			"utc": "2026-02-12T12:00:00Z",
+			"state": {"schemaVersion": 1, "totalRoundCount": round_count, "totalSlimCount": 7, "totalVoidRoundMl": 123.45, "totalVoidSlimMl": 67.89}
+		}
+		return {
+			"id": str(uuid.uuid4()),
+			"eventType": "Microsoft.Devices.DeviceTelemetry",
+			"data": {
+				"systemProperties": {"iothub-connection-device-id": device, "iothub-enqueuedtime": "2026-02-12T12:00:01Z"},
+				"body": base64.b64encode(json.dumps(body).encode()).decode()
+			},
+			"eventTime": "2026-02-12T12:00:01Z"
+		}
+
+
+class EventGridCaptureTest(EventGridEvents, TestCase):
+	"""
+	Decoding Event Grid telemetry captures for `manage.py replay_events`.
+	"""
+
+	def test_event_to_reading(self):
+		from .services.eventgrid import event_to_reading
+		reading = event_to_reading(self._event())
+		self.assertEqual(reading["azure_device_id"], "Device-0001")
+		self.assertEqual(reading["enqueued_at"], "2026-02-12T12:00:01Z")
+		self.assertEqual((reading["round_count"], reading["slim_count"]), (42, 7))
+		self.assertEqual(reading["round_void_count"], 123.45)
+		self.assertEqual(reading["raw_payload"]["deviceId"], "Device-0001")
+		self.assertIsNone(event_to_reading({"eventType": "Microsoft.EventGrid.SubscriptionValidationEvent", "data": {}}))
+
+	def test_capture_lines_streamed_with_bad_lines_reported(self):
+		import tempfile
+		from .services.eventgrid import iter_capture_events
+		with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as f:
+			f.write(json.dumps([self._event(round_count=1), self._event(round_count=2)]) + "\n")
+			f.write("{broken\n\n")
+			f.write(json.dumps(self._event(round_count=3)))  # no trailing newline
+		errors = []
+		events = list(iter_capture_events(f.name, on_error=lambda n, e: errors.append(n)))
+		os.unlink(f.name)
+		self.assertEqual([n for n, _ in events], [1, 1, 4])
+		self.assertEqual(errors, [2])
+
+	def test_pipeline_pool_matches_inline(self):
+		from .services.eventgrid import DecodePipeline
+		lines = [(n, json.dumps([self._event(round_count=n * 10 + i) for i in range(10)]).encode()) for n in range(1, 21)]
+		lines.append((21, b"{broken"))
+		with DecodePipeline(workers=1, chunk_size=4) as inline:
+			expected = [r for result in inline.imap_lines(lines) for r in result.readings]
+		with DecodePipeline(workers=2, chunk_size=4) as pooled:
+			results = list(pooled.imap_lines(lines))
+		self.assertEqual([r for result in results for r in result.readings], expected)
+		self.assertEqual(len(expected), 200)
+		self.assertEqual([e[0] for result in results for e in result.errors], [21])
+		with DecodePipeline(workers=3, inline_bytes=0) as pooled:
+			# the raw webhook body is split across the workers, never parsed in the parent
+			body = json.dumps([self._event(round_count=i) for i in range(31)]).encode()
+			self.assertEqual([r["round_count"] for r in pooled.decode_request(body).readings], list(range(31)))
+			self.assertEqual(len(pooled.decode_request(b"[broken").errors), 1)
+
+
+class ReplayEventsCommandTest(EventGridEvents, TestCase):
+	"""
+	`manage.py replay_events` backfills a capture with bounded concurrent bulk inserts.
+	"""
+
+	def setUp(self):
+		import tempfile
+		from unittest import mock
+		from .services.devices import device_cache
+		from .services.ingest import bulk_insert_readings
+		from .testing import FakePostgrest
+		device_cache.clear()
+		self.fake = FakePostgrest({"devices": [{"azure_device_id": "Device-0001"}]})
+		self.in_flight = self.peak = 0
+		lock = threading.Lock()
+
+		def tracked_insert(batch):
+			with lock:
+				self.in_flight += 1
+				self.peak = max(self.peak, self.in_flight)
+			try:
+				time.sleep(0.02)
+				return bulk_insert_readings(batch)
+			finally:
+				with lock:
+					self.in_flight -= 1
+
+		for patcher in (mock.patch("api.management.commands.replay_events.bulk_insert_readings", tracked_insert), self.fake.installed()):
+			patcher.__enter__()
+			self.addCleanup(patcher.__exit__, None, None, None)
+		self.tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(self.tmp.cleanup)
+		self.path = f"{self.tmp.name}/capture.jsonl"
+
+	def _replay(self, lines, *args):
+		import io
+		from django.core.management import call_command
+		with open(self.path, "w") as f:
+			f.write("\n".join(lines) + "\n")
+		stdout, stderr = io.StringIO(), io.StringIO()
+		call_command("replay_events", self.path, "--decode-workers", "1", *args, stdout=stdout, stderr=stderr)
+		return stdout.getvalue(), stderr.getvalue()
+
+	def test_batches_are_sized_and_in_flight_inserts_bounded(self):
+		lines = [json.dumps([self._event(round_count=n * 10 + i) for i in range(10)]) for n in range(5)]
+		stdout, _ = self._replay(lines, "--batch-size", "15", "--concurrency", "2")
+		self.assertEqual(sorted(c.batch for c in self.fake.calls_to("azure_data", "POST")), [5, 15, 15, 15])
+		self.assertEqual(sorted(r["round_count"] for r in self.fake.rows("azure_data")), list(range(50)))
+		self.assertEqual(self.peak, 2)
+		self.assertIn("Inserted 50 readings", stdout)
+
+	def test_summary_counts_and_invalid_readings_fail_alone(self):
+		undated = self._event(round_count=99)
+		undated["data"]["systemProperties"].pop("iothub-enqueuedtime")
+		undated.pop("eventTime")
+		undated["data"]["body"] = {"deviceId": "Device-0001", "state": {"totalRoundCount": 99}}
+		lines = [
+			json.dumps([self._event(round_count=1), self._event(round_count=2), undated]),
+			json.dumps(self._event(device="Device-9999")),
+			json.dumps({"eventType": "Microsoft.EventGrid.SubscriptionValidationEvent", "data": {}}),
+			"{broken",
+		]
+		stdout, stderr = self._replay(lines, "--batch-size", "10")
+		self.assertEqual(sorted(r["round_count"] for r in self.fake.rows("azure_data")), [1, 2])
+		self.assertIn("Inserted 2 readings", stdout)
+		self.assertIn("skipped 1 for unknown devices, ignored 1 non-telemetry events, 2 failed.", stdout)
+		self.assertIn("Invalid reading from Device-0001: enqueued_at", stderr)
+		self.assertIn("Line 4: invalid JSON", stderr)
+
+
+class QueryBudgetTest(TestCase):
+	"""
+	Round-trips and batch sizes per view, against the in-memory FakePostgrest.
+	Guards against regressions such as an extra lookup per ingested reading.
+	"""
+
+	READING = {"round_count": 1, "slim_count": 2, "round_void_count": 1.5, "slim_void_count": 2.5, "enqueued_at": "2026-02-13T14:30:00Z"}
+
+	def setUp(self):
+		from unittest import mock
+		from django.core.cache import cache
+		from .services.devices import device_cache
+		from .services.ratelimit import LocalBucketStore, device_limiter
+		from .testing import FakePostgrest
+		cache.clear()
+		device_cache.clear()
+		self.fake = FakePostgrest({"devices": [{"azure_device_id": f"Device-{i:04d}"} for i in range(1, 4)]})
+		for patcher in (mock.patch.object(device_limiter, "store", LocalBucketStore()), self.fake.installed()):
+			patcher.__enter__()
+			self.addCleanup(patcher.__exit__, None, None, None)
+
+	def _post(self, azure_device_id):
+		return self.client.post("/api/azure-data/", dict(self.READING, azure_device_id=azure_device_id), content_type="application/json")
+
+	def _seed_readings(self, n, azure_device_id="Device-0001"):
+		from datetime import datetime, timedelta, timezone
+		start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+		self.fake.seed("azure_data", [
+			dict(self.READING, azure_device_id=azure_device_id, device_id=1, round_count=i, enqueued_at=(start + timedelta(minutes=i)).isoformat())
+			for i in range(n)
+		])
+
+	def test_post_is_one_lookup_plus_one_insert_then_insert_only(self):
+		response = self._post("Device-0001")
+		self.assertEqual(response.status_code, 201)
+		self.assertEqual(response.json()["device_id"], 1)
+		self.assertEqual([(c.method, c.table, c.batch) for c in self.fake.calls], [("GET", "devices", 0), ("POST", "azure_data", 1)])
+
+		self.fake.reset_calls()
+		self.assertEqual(self._post("Device-0001").status_code, 201)
+		self.assertEqual([(c.method, c.table) for c in self.fake.calls], [("POST", "azure_data")])
+
+	def test_unknown_device_is_one_lookup_and_no_insert(self):
+		self.assertEqual(self._post("Device-9999").status_code, 404)
+		self.assertEqual([(c.method, c.table) for c in self.fake.calls], [("GET", "devices")])
+
+	def test_list_page_is_one_query(self):
+		self._seed_readings(30)
+		response = self.client.get("/api/azure-data/?limit=10&offset=10")
+		self.assertEqual([r["round_count"] for r in response.json()], list(range(10, 20)))
+		self.assertEqual(len(self.fake.calls), 1)
+		self.assertEqual(self.fake.calls[0].params["limit"], "10")
+
+	def test_detail_operations_are_one_query_each(self):
+		self._seed_readings(1)
+		self.assertEqual(self.client.get("/api/azure-data/1/").status_code, 200)
+		update = dict(self.READING, azure_device_id="Device-0001", round_count=5)
+		self.assertEqual(self.client.put("/api/azure-data/1/", update, content_type="application/json").json()["round_count"], 5)
+		self.assertEqual(self.client.delete("/api/azure-data/1/").status_code, 204)
+		self.assertEqual([c.method for c in self.fake.calls], ["GET", "PATCH", "DELETE"])
+		self.assertEqual(self.fake.rows("azure_data"), [])
+
+	def test_bulk_dry_run_counts_without_writing(self):
+		self._seed_readings(5)
+		body = {"azure_device_id": "Device-0001", "set": {"round_count": 0}, "dry_run": True}
+		response = self.client.patch("/api/azure-data/bulk/", body, content_type="application/json")
+		self.assertEqual(response.json()["updated"], 5)
+		self.assertEqual([c.method for c in self.fake.calls], ["HEAD"])
+
+		self.fake.reset_calls()
+		body["dry_run"] = False
+		self.assertEqual(self.client.patch("/api/azure-data/bulk/", body, content_type="application/json").json()["updated"], 5)
+		self.assertEqual([c.method for c in self.fake.calls], ["PATCH"])
+
+	def test_bulk_delete_is_one_count_or_one_delete(self):
+		self._seed_readings(5)
+		self._seed_readings(2, "Device-0002")
+		body = {"azure_device_id": "Device-0001", "dry_run": True}
+		self.assertEqual(self.client.delete("/api/azure-data/bulk/", body, content_type="application/json").json()["deleted"], 5)
+		self.assertEqual([c.method for c in self.fake.calls], ["HEAD"])
+
+		self.fake.reset_calls()
+		body["dry_run"] = False
+		self.assertEqual(self.client.delete("/api/azure-data/bulk/", body, content_type="application/json").json()["deleted"], 5)
+		self.assertEqual([c.method for c in self.fake.calls], ["DELETE"])
+		self.assertEqual({r["azure_device_id"] for r in self.fake.rows("azure_data")}, {"Device-0002"})
+
+	def test_bulk_write_timeout_is_not_retried(self):
+		import httpx
+		from unittest import mock
+		from .services.resilience import supabase_breaker, supabase_executor
+		self.addCleanup(supabase_breaker.record_success)
+		self._seed_readings(5)
+		# the DELETE commits, then the response is lost; a retry would report 0 deleted
+		self.fake.fail("DELETE", "azure_data", httpx.ReadTimeout("timed out"), times=1)
+		with mock.patch.object(supabase_executor.retry, "sleep", lambda s: None):
+			response = self.client.delete("/api/azure-data/bulk/", {"azure_device_id": "Device-0001"}, content_type="application/json")
+		self.assertEqual(response.status_code, 503)
+		self.assertEqual(len(self.fake.calls_to("azure_data", "DELETE")), 1)
+
+	def test_bulk_provisioning_is_chunked(self):
+		ids = [f"Device-{i:04d}" for i in range(1, 1201)]
+		response = self.client.post("/api/devices/bulk/", {"azure_device_ids": ids}, content_type="application/json")
+		self.assertEqual(response.json()["created"], 1197)
+		self.assertEqual([c.batch for c in self.fake.calls_to("devices", "POST")], [500, 500, 200])
+		self.assertEqual(len(self.fake.calls_to("devices", "GET")), 1)  # the 3 pre-existing devices
+
+	def test_register_device_is_one_insert_and_duplicate_is_conflict(self):
+		response = self.client.post("/api/devices/", {"azure_device_id": "Device-0100"}, content_type="application/json")
+		self.assertEqual(response.status_code, 201)
+		self.assertEqual([(c.method, c.table, c.batch) for c in self.fake.calls], [("POST", "devices", 1)])
+
+		response = self.client.post("/api/devices/", {"azure_device_id": "Device-0001"}, content_type="application/json")
+		self.assertEqual(response.status_code, 409)
+		self.assertIn("azure_device_id", response.json())
+
+	def test_device_list_served_from_cache(self):
+		self.client.get("/api/devices/")
+		self.client.get("/api/devices/")
+		self.assertEqual(len(self.fake.calls), 1)
+
+	def test_series_reads_time_slices_concurrently(self):
+		from collections import Counter
+		from unittest import mock
+		self._seed_readings(2500)
+		self.fake.latency = 0.1
+		spans = []
+		handle = self.fake.handle_request
+
+		def timed(request):
+			started = time.perf_counter()
+			try:
+				return handle(request)
+			finally:
+				spans.append((request.method, request.url.params.get("limit"), started, time.perf_counter()))
+
+		with mock.patch.object(self.fake, "handle_request", timed):
+			response = self.client.get("/api/devices/Device-0001/series/?points=100")
+		self.assertEqual(response.json()["raw_points"], 2500)
+		self.assertEqual(len(response.json()["series"]["round_count"]), 100)
+		# count + first/last edge, then three ~834-row slices of one page each
+		self.assertEqual(Counter(c.method for c in self.fake.calls), {"HEAD": 1, "GET": 5})
+		# each round's requests are in flight together rather than back to back
+		for round_spans in ([s for s in spans if s[1] != "1000"], [s for s in spans if s[1] == "1000"]):
+			self.assertEqual(len(round_spans), 3)
+			self.assertLess(max(s[2] for s in round_spans), min(s[3] for s in round_spans))
+
+	def test_series_accepts_long_ranges_and_respects_bounds(self):
+		self._seed_readings(2500)
+		response = self.client.get("/api/devices/Device-0001/series/?points=50&method=lttb&enqueued_from=2026-01-01T10:00:00Z")
+		series = response.json()["series"]
+		self.assertEqual(response.json()["raw_points"], 2500 - 600)
+		self.assertEqual(len(series["round_count"]), 50)
+		self.assertEqual((series["round_count"][0], series["round_count"][-1]), (600, 2499))
+		empty = self.client.get("/api/devices/Device-0002/series/")
+		self.assertEqual((empty.json()["raw_points"], empty.json()["series"]["round_count"]), (0, []))
+
+	def test_anomaly_scan_reads_one_query_per_page(self):
+		self._seed_readings(2500)
+		response = self.client.get("/api/devices/Device-0001/anomalies/")
+		self.assertEqual(response.json()["scanned"], 2500)
+		self.assertEqual([(c.method, c.table) for c in self.fake.calls], [("GET", "azure_data")] * 3)
+
+	def test_latency_injection_models_round_trips(self):
+		self.fake.latency = 0.02
+		started = time.perf_counter()
+		self._post("Device-0002")
+		self.assertGreaterEqual(time.perf_counter() - started, 0.04)
+		self.assertAlmostEqual(self.fake.network_time, 0.04)
+
+
+class StartupImportTest(TestCase):
+	"""
+	Commands and the URLconf must not import the Supabase client stack, the
+	drf_yasg schema generator or numpy until they are actually used.
+	"""
+
+	def test_heavy_modules_stay_unimported(self):
+		import subprocess
+		import sys
+		from django.conf import settings
+		code = (
+			"import json, sys, django; django.setup()\n"
+			"import django_swim_api.urls, api.management.commands.ensure_today\n"
+			"print(json.dumps([m for m in ('supabase', 'postgrest', 'httpx', 'drf_yasg.views', 'numpy') if m in sys.modules]))"
+		)
+		proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=settings.BASE_DIR)
+		self.assertEqual(proc.returncode, 0, proc.stderr)
+		self.assertEqual(json.loads(proc.stdout), [])
+
+	def test_offline_benchmark_needs_no_credentials(self):
+		import io
+		from unittest import mock
+		from django.core.management import call_command
+		stdout = io.StringIO()
+		with mock.patch.dict(os.environ):
+			os.environ.pop("SUPABASE_URL", None)
+			os.environ.pop("SUPABASE_KEY", None)
+			call_command("bench_startup", "--runs", "1", "--offline", stdout=stdout, stderr=io.StringIO())
+		self.assertIn("manage.py ensure_today", stdout.getvalue())
+		self.assertEqual(stdout.getvalue().count("200 OK"), 2)
+
+	def test_missing_credentials_fail_on_first_use_not_import(self):
+		from unittest import mock
+		from .services import supabase_client
+		with mock.patch.multiple(supabase_client, SUPABASE_URL=None, SUPABASE_KEY=None, _client=None):
+			with self.assertRaisesMessage(RuntimeError, "SUPABASE_URL"):
+				supabase_client.supabase.table("devices")
@@ -0,0 +1,29 @@
+# azure_api/throttling.py
+import math
+
+from rest_framework.throttling import BaseThrottle
+
+from .services.ratelimit import device_limiter
+
+
+class DeviceIngestThrottle(BaseThrottle):
+    """
+    Per-device token bucket on ingest, so one device stuck in a firmware loop
+    can't starve everyone else. Only POSTs carrying an azure_device_id are limited.
+    """
+
+    limiter = device_limiter
+
+    def allow_request(self, request, view):
+        self._wait = 0.0
+        if request.method != "POST":
+            return True
+        data = request.data
+        azure_device_id = data.get("azure_device_id") if hasattr(data, "get") else None
+        if not azure_device_id:
+            return True
+        self._wait = self.limiter.check(azure_device_id)
+        return self._wait == 0
+
+    def wait(self):
+        return max(1, math.ceil(self._wait))
@@ -4,5 +4,13 @@ from . import views
 
 urlpatterns = [
     path("azure-data/", views.AzureDataListCreate.as_view(), name="azure-data-list-create"),
+    path("azure-data/live/", views.live_feed, name="azure-data-live"),
+    path("azure-data/live/poll/", views.live_poll, name="azure-data-live-poll"),
+    path("azure-data/bulk/", views.AzureDataBulk.as_view(), name="azure-data-bulk"),
     path("azure-data/<int:pk>/", views.AzureDataDetail.as_view(), name="azure-data-detail"),
+    path("devices/", views.DeviceListCreate.as_view(), name="device-list-create"),
+    path("devices/bulk/", views.DeviceBulkUpsert.as_view(), name="device-bulk-upsert"),
+    path("devices/<str:azure_device_id>/series/", views.DeviceSeries.as_view(), name="device-series"),
+    path("devices/<str:azure_device_id>/anomalies/", views.DeviceAnomalies.as_view(), name="device-anomalies"),
+    path("metrics/resilience/", views.ResilienceMetrics.as_view(), name="resilience-metrics"),
 ]
\ No newline at end of file
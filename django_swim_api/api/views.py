@@ -2,7 +2,25 @@ from django.shortcuts import render
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .serializers import AzureDataSerializer
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.parsers import FormParser, MultiPartParser
+from .serializers import (
+    AzureDataSerializer, AzureDataBulkFilterSerializer, AzureDataBulkUpdateSerializer,
+    DeviceSerializer, DeviceBulkUpsertSerializer, AnomalyQuerySerializer, SeriesQuerySerializer,
+)
+from .renderers import CompressedJSONRenderer, CompressedMessagePackRenderer
+from .parsers import DecompressingJSONParser, DecompressingMessagePackParser
+from .throttling import DeviceIngestThrottle
+from .services.ratelimit import ingest_shedder, Overloaded
+from .services.resilience import execute, is_transient, is_unsent, supabase_breaker, CircuitOpen
+from .services.spool import spool
+from .services.devices import DEVICES_TABLE, device_cache, provision_devices, resolve_device_ids
+from .services.feed import broker
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+import json
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from .services.supabase_client import supabase
@@ -13,6 +31,10 @@ from datetime import datetime
 
 TABLE = "azure_data"
 
+# High-volume clients can negotiate MessagePack and gzip/zstd on these endpoints
+BULK_RENDERER_CLASSES = [CompressedJSONRenderer, CompressedMessagePackRenderer, BrowsableAPIRenderer]
+BULK_PARSER_CLASSES = [DecompressingJSONParser, DecompressingMessagePackParser, FormParser, MultiPartParser]
+
 def serialize_payload(payload):
     """Convert non-JSON-serializable types to JSON-serializable formats"""
     serialized = {}
@@ -27,7 +49,37 @@ def serialize_payload(payload):
             serialized[key] = value
     return serialized
 
-class AzureDataListCreate(APIView):
+def apply_bulk_filter(query, criteria):
+    """Translate validated bulk filter criteria into PostgREST filters on query."""
+    if criteria.get("ids"):
+        query = query.in_("id", criteria["ids"])
+    if criteria.get("azure_device_id") is not None:
+        query = query.eq("azure_device_id", criteria["azure_device_id"])
+    if criteria.get("device_id") is not None:
+        query = query.eq("device_id", criteria["device_id"])
+    if criteria.get("enqueued_from"):
+        query = query.gte("enqueued_at", criteria["enqueued_from"].isoformat())
+    if criteria.get("enqueued_to"):
+        query = query.lt("enqueued_at", criteria["enqueued_to"].isoformat())
+    return query
+
+class SupabaseAPIView(APIView):
+    """Maps Supabase outages (open breaker, exhausted retries) to 503 instead of a bare 500."""
+
+    def handle_exception(self, exc):
+        if isinstance(exc, CircuitOpen) or is_transient(exc):
+            return Response(
+                {"error": f"Supabase unavailable: {exc}"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(getattr(exc, "retry_after", 1))}
+            )
+        return super().handle_exception(exc)
+
+class AzureDataListCreate(SupabaseAPIView):
+    renderer_classes = BULK_RENDERER_CLASSES
+    parser_classes = BULK_PARSER_CLASSES
+    throttle_classes = [DeviceIngestThrottle]
+
     @swagger_auto_schema(
         operation_description="List Azure Data",
         responses={200: AzureDataSerializer(many=True)}
@@ -37,7 +89,7 @@ class AzureDataListCreate(APIView):
         limit = int(request.query_params.get("limit", 100))
         offset = int(request.query_params.get("offset", 0))
         qb = supabase.table(TABLE).select("*").order("id", desc=False).limit(limit).offset(offset)
-        res = qb.execute()
+        res = execute(qb)
         if getattr(res, "error", None):
             return Response({"error": str(getattr(res, "error", "Unknown error"))}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         return Response(res.data)
@@ -78,54 +130,84 @@ class AzureDataListCreate(APIView):
                 description="Successfully created",
                 schema=AzureDataSerializer
             ),
+            202: openapi.Response(description="Supabase unreachable; reading spooled locally for replay"),
             404: openapi.Response(description="Device not found"),
-            400: openapi.Response(description="Validation error")
+            400: openapi.Response(description="Validation error"),
+            429: openapi.Response(description="Device exceeded its ingest rate (see Retry-After)"),
+            503: openapi.Response(description="Backend overloaded, request shed (see Retry-After)")
         }
     )
     def post(self, request):
+        try:
+            with ingest_shedder.admit():
+                return self._create(request)
+        except Overloaded as e:
+            return Response(
+                {"error": "Service overloaded, retry later"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(e.retry_after)}
+            )
+
+    def _create(self, request):
         serializer = AzureDataSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        
-        # Extract azure_device_id to lookup device
-        azure_device_id = serializer.validated_data.get('azure_device_id')
-        
-        # Lookup device by azure_device_id (like edge function does)
+        payload = serialize_payload(serializer.validated_data)
+        azure_device_id = payload['azure_device_id']
+
+        # Lookup device by azure_device_id (like edge function does).
+        # Served from the in-process device cache after the first lookup.
+        # If Supabase is unreachable, accept the reading into the local spool
+        # (drained later by `manage.py replay_spool`) instead of losing it; a
+        # failed lookup wrote nothing, so any outage here is safe to spool.
+        # Other backend failures propagate rather than masquerading as 404.
         try:
-            device_lookup = supabase.table("devices").select("id").eq("azure_device_id", azure_device_id).single().execute()
-            
-            if getattr(device_lookup, "error", None) or not device_lookup.data:
-                return Response(
-                    {"error": f"Device not found: {azure_device_id}"}, 
-                    status=status.HTTP_404_NOT_FOUND
-                )
-            
-            device_id = device_lookup.data['id']
+            device_id = resolve_device_ids([azure_device_id], timer=ingest_shedder.timed).get(azure_device_id)
         except Exception as e:
-            # Handle case where .single() throws an error when 0 or >1 rows returned
+            if spool is None or not (isinstance(e, CircuitOpen) or is_transient(e)):
+                raise
+            return self._spool(payload)
+
+        if device_id is None:
             return Response(
                 {"error": f"Device not found: {azure_device_id}"}, 
                 status=status.HTTP_404_NOT_FOUND
             )
-        
-        # Prepare payload with device_id
-        payload = serialize_payload(serializer.validated_data)
-        payload['device_id'] = device_id
-        
-        res = supabase.table(TABLE).insert(payload).execute()
+
+        try:
+            return self._store(dict(payload, device_id=device_id))
+        except Exception as e:
+            # Only spool inserts that provably never reached Supabase. A timeout
+            # after sending may have committed the row, and replaying it would
+            # duplicate it; that surfaces as 503 and the sender decides.
+            if spool is None or not (isinstance(e, CircuitOpen) or is_unsent(e)):
+                raise
+            return self._spool(payload)
+
+    def _spool(self, payload):
+        spool.append(payload)
+        return Response(
+            {"status": "spooled", "azure_device_id": payload["azure_device_id"]},
+            status=status.HTTP_202_ACCEPTED
+        )
+
+    def _store(self, payload):
+        with ingest_shedder.timed():
+            res = execute(supabase.table(TABLE).insert(payload), idempotent=False)
         
         if getattr(res, "error", None):
             return Response(
                 {"supabase_error": str(res.error), "raw": getattr(res, "data", None)}, 
                 status=400
             )
+        broker.publish(res.data[0])
         return Response(res.data[0], status=status.HTTP_201_CREATED)
 
-class AzureDataDetail(APIView):
+class AzureDataDetail(SupabaseAPIView):
     def get(self, request, pk):
-        res = supabase.table(TABLE).select("*").eq("id", pk).maybe_single().execute()
+        res = execute(supabase.table(TABLE).select("*").eq("id", pk).maybe_single())
         if getattr(res, "error", None):
             return Response({"error": str(getattr(res, "error", "Unknown error"))}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        if res.data is None:
+        if res is None or res.data is None:
             return Response(status=status.HTTP_404_NOT_FOUND)
         return Response(res.data)
 
@@ -133,13 +215,323 @@ class AzureDataDetail(APIView):
         serializer = AzureDataSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         payload = serialize_payload(serializer.validated_data)
-        res = supabase.table(TABLE).update(payload).eq("id", pk).execute()
+        res = execute(supabase.table(TABLE).update(payload).eq("id", pk))
         if getattr(res, "error", None):
             return Response({"error": str(getattr(res, "error", "Unknown error"))}, status=status.HTTP_400_BAD_REQUEST)
         return Response(res.data[0])
 
     def delete(self, request, pk):
-        res = supabase.table(TABLE).delete().eq("id", pk).execute()
+        res = execute(supabase.table(TABLE).delete().eq("id", pk))
         if getattr(res, "error", None):
             return Response({"error": str(getattr(res, "error", "Unknown error"))}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class AzureDataBulk(SupabaseAPIView):
+    """
+    Filter-based bulk update/delete. Each request is a single set-based
+    PATCH/DELETE against PostgREST; dry_run only counts the matched rows.
+    """
+    renderer_classes = BULK_RENDERER_CLASSES
+    parser_classes = BULK_PARSER_CLASSES
+
+    def _count(self, criteria):
+        from postgrest.types import CountMethod
+
+        res = execute(apply_bulk_filter(supabase.table(TABLE).select("id", count=CountMethod.exact, head=True), criteria))
+        return res.count or 0
+
+    @swagger_auto_schema(
+        request_body=AzureDataBulkUpdateSerializer,
+        operation_description="Bulk update Azure Data records matched by ids or device + enqueued_at range",
+        responses={200: openapi.Response(description="Affected row count: {\"updated\": n, \"dry_run\": bool}")}
+    )
+    def patch(self, request):
+        serializer = AzureDataBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        criteria = serializer.validated_data
+        if criteria["dry_run"]:
+            return Response({"updated": self._count(criteria), "dry_run": True})
+        from postgrest.types import CountMethod, ReturnMethod
+
+        values = serialize_payload(criteria["set"])
+        query = supabase.table(TABLE).update(values, count=CountMethod.exact, returning=ReturnMethod.minimal)
+        # Not retried once sent: a retry after a committed write would report the
+        # wrong count (0 for a DELETE), so an ambiguous timeout surfaces as 503
+        res = execute(apply_bulk_filter(query, criteria), idempotent=False)
+        return Response({"updated": res.count or 0, "dry_run": False})
+
+    @swagger_auto_schema(
+        request_body=AzureDataBulkFilterSerializer,
+        operation_description="Bulk delete Azure Data records matched by ids or device + enqueued_at range",
+        responses={200: openapi.Response(description="Affected row count: {\"deleted\": n, \"dry_run\": bool}")}
+    )
+    def delete(self, request):
+        serializer = AzureDataBulkFilterSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        criteria = serializer.validated_data
+        if criteria["dry_run"]:
+            return Response({"deleted": self._count(criteria), "dry_run": True})
+        from postgrest.types import CountMethod, ReturnMethod
+
+        query = supabase.table(TABLE).delete(count=CountMethod.exact, returning=ReturnMethod.minimal)
+        res = execute(apply_bulk_filter(query, criteria), idempotent=False)
+        return Response({"deleted": res.count or 0, "dry_run": False})
+
+
+DEVICE_LIST_CACHE_SECONDS = 60
+UNIQUE_VIOLATION = "23505"  # Postgres error code PostgREST passes through
+DEVICE_LIST_VERSION_KEY = "devices:list:version"
+
+def _device_list_version():
+    return cache.get_or_set(DEVICE_LIST_VERSION_KEY, 1, timeout=None)
+
+def invalidate_device_list():
+    try:
+        cache.incr(DEVICE_LIST_VERSION_KEY)
+    except ValueError:
+        cache.set(DEVICE_LIST_VERSION_KEY, 1, timeout=None)
+
+class DeviceListCreate(SupabaseAPIView):
+    renderer_classes = BULK_RENDERER_CLASSES
+    parser_classes = BULK_PARSER_CLASSES
+
+    @swagger_auto_schema(
+        operation_description="List devices (cached briefly; invalidated when devices are created)",
+        responses={200: DeviceSerializer(many=True)}
+    )
+    def get(self, request):
+        limit = int(request.query_params.get("limit", 100))
+        offset = int(request.query_params.get("offset", 0))
+        key = f"devices:list:{_device_list_version()}:{limit}:{offset}"
+        data = cache.get(key)
+        if data is None:
+            res = execute(supabase.table(DEVICES_TABLE).select("*").order("id", desc=False).limit(limit).offset(offset))
+            data = res.data
+            cache.set(key, data, DEVICE_LIST_CACHE_SECONDS)
+            device_cache.set_many({row["azure_device_id"]: row["id"] for row in data})
+        return Response(data)
+
+    @swagger_auto_schema(
+        request_body=DeviceSerializer,
+        operation_description="Register a single device",
+        responses={
+            201: DeviceSerializer,
+            400: openapi.Response(description="Validation error"),
+            409: openapi.Response(description="azure_device_id already registered")
+        }
+    )
+    def post(self, request):
+        serializer = DeviceSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        from postgrest.exceptions import APIError
+
+        try:
+            res = execute(supabase.table(DEVICES_TABLE).insert(serialize_payload(serializer.validated_data)), idempotent=False)
+        except APIError as e:
+            if e.code != UNIQUE_VIOLATION:
+                raise
+            azure_device_id = serializer.validated_data["azure_device_id"]
+            return Response(
+                {"azure_device_id": [f"Device already registered: {azure_device_id}"]},
+                status=status.HTTP_409_CONFLICT
+            )
+        row = res.data[0]
+        device_cache.set_many({row["azure_device_id"]: row["id"]})
+        invalidate_device_list()
+        return Response(row, status=status.HTTP_201_CREATED)
+
+class DeviceBulkUpsert(SupabaseAPIView):
+    renderer_classes = BULK_RENDERER_CLASSES
+    parser_classes = BULK_PARSER_CLASSES
+
+    @swagger_auto_schema(
+        request_body=DeviceBulkUpsertSerializer,
+        operation_description="Provision many devices at once via chunked upserts; existing devices are left untouched",
+        responses={200: openapi.Response(description="{\"devices\": {azure_device_id: id}, \"created\": n}")}
+    )
+    def post(self, request):
+        serializer = DeviceBulkUpsertSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        mapping, created = provision_devices(serializer.validated_data["azure_device_ids"])
+        if created:
+            invalidate_device_list()
+        return Response({"devices": mapping, "created": created})
+
+
+class DeviceAnomalies(SupabaseAPIView):
+    """On-demand gap / negative delta / void outlier scan for one device over a bounded range."""
+    MAX_ROWS = 50000
+
+    @swagger_auto_schema(
+        query_serializer=AnomalyQuerySerializer,
+        operation_description="Scan one device's readings for reporting gaps, negative counter deltas and void outliers"
+    )
+    def get(self, request, azure_device_id):
+        # numpy-backed; imported on first use so processes that never scan don't pay for numpy
+        from .services.anomalies import describe, detect, load_device_columns
+
+        serializer = AnomalyQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        start, end = params.get("enqueued_from"), params.get("enqueued_to")
+        # (start, 0) as the keyset cursor means enqueued_at >= start
+        columns, enqueued_at = load_device_columns(
+            azure_device_id,
+            after=(start.isoformat(), 0) if start else None,
+            until=end.isoformat() if end else None,
+            max_rows=self.MAX_ROWS,
+        )
+        if columns is None:
+            return Response({"azure_device_id": azure_device_id, "scanned": 0, "findings": []})
+        findings, _ = detect(
+            columns,
+            gap_seconds=params["gap_minutes"] * 60,
+            z_threshold=params["z_threshold"],
+            window=params["window"],
+        )
+        return Response({
+            "azure_device_id": azure_device_id,
+            "scanned": len(enqueued_at),
+            "truncated": len(enqueued_at) >= self.MAX_ROWS,
+            "findings": describe(findings, columns, enqueued_at, azure_device_id),
+        })
+
+
+class DeviceSeries(SupabaseAPIView):
+    """
+    One device's counters and voids over a range, downsampled to at most
+    `points` per series so chart responses stay small however long the range.
+    Pages are folded into O(points) bucket accumulators as they arrive, and
+    the range is read as concurrent time slices, so neither memory nor latency
+    grows with the raw row count the way a sequential full read would.
+    """
+    renderer_classes = BULK_RENDERER_CLASSES
+
+    @swagger_auto_schema(
+        query_serializer=SeriesQuerySerializer,
+        operation_description="Downsampled round_count / slim_count / void series for one device (bucket averages or LTTB)"
+    )
+    def get(self, request, azure_device_id):
+        from .services.series import FIELDS as SERIES_FIELDS, load_series, to_payload
+
+        serializer = SeriesQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        start, end = params.get("enqueued_from"), params.get("enqueued_to")
+        series, raw_points = load_series(
+            azure_device_id,
+            params["points"],
+            method=params["method"],
+            field=params["field"],
+            since=start.isoformat() if start else None,
+            until=end.isoformat() if end else None,
+            slices=settings.SERIES_FETCH_SLICES,
+        )
+        body = {
+            "azure_device_id": azure_device_id,
+            "method": params["method"],
+            "raw_points": raw_points,
+        }
+        if series is None:
+            body["series"] = {name: [] for name in ("enqueued_at",) + SERIES_FIELDS}
+        else:
+            body["series"] = to_payload(series)
+        return Response(body)
+
+
+class ResilienceMetrics(APIView):
+    """Circuit breaker and load-shedding state for dashboards/health checks."""
+
+    def get(self, request):
+        return Response({
+            "supabase_breaker": supabase_breaker.snapshot(),
+            "ingest_shedder": {
+                "in_flight": ingest_shedder.in_flight,
+                "allowed_concurrency": ingest_shedder.allowed_concurrency(),
+                "latency_ewma_ms": round(ingest_shedder.latency * 1000, 1),
+            },
+            "spool": spool.stats() if spool is not None else None,
+            "device_cache": device_cache.stats(),
+            "live_feed": broker.stats(),
+        })
+
+
+LIVE_FEED_HEARTBEAT_SECONDS = 15
+LIVE_POLL_MAX_SECONDS = 60
+
+def _feed_cursor(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+async def live_feed(request):
+    """
+    Server-Sent Events stream of newly ingested readings, optionally filtered by
+    ?azure_device_id= (repeatable). Needs the ASGI app (django_swim_api/asgi.py);
+    a client that falls too far behind is sent a `dropped` event and disconnected.
+    Reconnecting with Last-Event-ID replays readings still in the broker history.
+    """
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI Django buffers an async iterator completely before sending,
+        # so this endless stream would pin the worker and grow without bound
+        return JsonResponse(
+            {"error": "The live feed needs the ASGI server (django_swim_api.asgi); use /api/azure-data/live/poll/ instead."},
+            status=501
+        )
+    device_ids = request.GET.getlist("azure_device_id")
+    last_seq = _feed_cursor(request.headers.get("Last-Event-ID"))
+
+    async def stream():
+        nonlocal last_seq
+        sub = broker.subscribe(device_ids)
+        try:
+            yield "retry: 3000\n\n"
+            if last_seq is not None:
+                for seq, record in broker.since(last_seq, sub):
+                    last_seq = seq
+                    yield f"id: {seq}\nevent: reading\ndata: {json.dumps(record)}\n\n"
+            while True:
+                entry = await sub.get(LIVE_FEED_HEARTBEAT_SECONDS)
+                if sub.dropped:
+                    yield "event: dropped\ndata: {\"reason\": \"client too slow\"}\n\n"
+                    return
+                if entry is None:
+                    yield ": keepalive\n\n"
+                    continue
+                seq, record = entry
+                if last_seq is not None and seq <= last_seq:
+                    continue
+                last_seq = seq
+                yield f"id: {seq}\nevent: reading\ndata: {json.dumps(record)}\n\n"
+        finally:
+            sub.close()
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+async def live_poll(request):
+    """
+    Long-poll fallback: returns readings newer than ?after= immediately if any are
+    buffered, otherwise waits up to ?timeout= seconds for the next one.
+    """
+    device_ids = request.GET.getlist("azure_device_id")
+    after = _feed_cursor(request.GET.get("after"))
+    try:
+        timeout = min(float(request.GET.get("timeout", 25)), LIVE_POLL_MAX_SECONDS)
+    except ValueError:
+        return JsonResponse({"error": "timeout must be a number"}, status=400)
+
+    sub = broker.subscribe(device_ids)
+    try:
+        entries = broker.since(after, sub) if after is not None else []
+        if not entries:
+            first = await sub.get(timeout)
+            entries = ([first] if first else []) + sub.drain()
+    finally:
+        sub.close()
+    last = entries[-1][0] if entries else (after if after is not None else broker.stats()["last_seq"])
+    return JsonResponse({"after": last, "readings": [record for _, record in entries]})
@@ -10,7 +10,10 @@ https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 import os
 
 from django.core.asgi import get_asgi_application
+from .warmup import warm_up
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_swim_api.settings')
 
 application = get_asgi_application()
+
+warm_up()
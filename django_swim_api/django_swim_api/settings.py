@@ -117,6 +117,50 @@ USE_I18N = True
 USE_TZ = True
 
 
+# Ingest protection (api/services/ratelimit.py)
+# Per-device token bucket: sustained requests/sec and burst size (rate 0 disables)
+INGEST_DEVICE_RATE = float(os.getenv("INGEST_DEVICE_RATE", "5"))
+INGEST_DEVICE_BURST = int(os.getenv("INGEST_DEVICE_BURST", "20"))
+# Django cache alias to share buckets across workers; empty keeps them in-process
+INGEST_RATE_LIMIT_CACHE = os.getenv("INGEST_RATE_LIMIT_CACHE", "")
+# Load shedding: in-flight ingest cap, reduced as Supabase latency exceeds the target
+INGEST_MAX_CONCURRENCY = int(os.getenv("INGEST_MAX_CONCURRENCY", "32"))
+INGEST_LATENCY_TARGET_MS = float(os.getenv("INGEST_LATENCY_TARGET_MS", "500"))
+
+# Supabase resilience (api/services/resilience.py)
+SUPABASE_RETRY_ATTEMPTS = int(os.getenv("SUPABASE_RETRY_ATTEMPTS", "3"))
+SUPABASE_RETRY_BASE_DELAY_MS = float(os.getenv("SUPABASE_RETRY_BASE_DELAY_MS", "100"))
+SUPABASE_BREAKER_FAILURES = int(os.getenv("SUPABASE_BREAKER_FAILURES", "5"))
+SUPABASE_BREAKER_RESET_SECONDS = float(os.getenv("SUPABASE_BREAKER_RESET_SECONDS", "30"))
+
+# Local spool for readings accepted while Supabase is down (api/services/spool.py);
+# empty INGEST_SPOOL_DIR disables spooling. Drain with `manage.py replay_spool`.
+INGEST_SPOOL_DIR = os.getenv("INGEST_SPOOL_DIR", str(BASE_DIR / "spool"))
+INGEST_SPOOL_SEGMENT_MB = float(os.getenv("INGEST_SPOOL_SEGMENT_MB", "64"))
+INGEST_SPOOL_FSYNC_BATCH = int(os.getenv("INGEST_SPOOL_FSYNC_BATCH", "64"))
+INGEST_SPOOL_FSYNC_INTERVAL_MS = float(os.getenv("INGEST_SPOOL_FSYNC_INTERVAL_MS", "200"))
+
+# In-process azure_device_id -> devices.id cache (api/services/devices.py)
+DEVICE_CACHE_TTL_SECONDS = float(os.getenv("DEVICE_CACHE_TTL_SECONDS", "300"))
+DEVICE_CACHE_MAX_SIZE = int(os.getenv("DEVICE_CACHE_MAX_SIZE", "100000"))
+
+# Per-device watermarks for `manage.py detect_anomalies` (api/services/anomalies.py)
+ANOMALY_STATE_FILE = os.getenv("ANOMALY_STATE_FILE", str(BASE_DIR / "anomaly_state.json"))
+
+# Time slices /api/devices/<id>/series/ reads concurrently (each in 1000-row
+# pages), so a range costs about rows / (1000 * slices) sequential round-trips
+SERIES_FETCH_SLICES = int(os.getenv("SERIES_FETCH_SLICES", "8"))
+
+# Live feed (api/services/feed.py): per-client buffer before a slow viewer is
+# dropped, and how many recent readings are kept for reconnect/long-poll resume
+LIVE_FEED_BUFFER = int(os.getenv("LIVE_FEED_BUFFER", "256"))
+LIVE_FEED_HISTORY = int(os.getenv("LIVE_FEED_HISTORY", "1024"))
+
+# Servers (wsgi.py/asgi.py) load the URLconf and Supabase client at boot so the
+# first request doesn't pay for them; management commands always stay lazy
+STARTUP_WARM_UP = os.getenv("STARTUP_WARM_UP", "1") == "1"
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
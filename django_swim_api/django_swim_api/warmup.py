@@ -0,0 +1,20 @@
+"""
+Boot-time warm-up for server processes.
+
+Views and the Supabase client are imported lazily so that management commands
+(cron jobs such as ensure_today) start quickly. A web worker will need all of
+it anyway, so wsgi.py/asgi.py call warm_up() to pay that cost at boot rather
+than on the first request.
+"""
+from django.conf import settings
+
+
+def warm_up():
+    if not settings.STARTUP_WARM_UP:
+        return
+    from django.urls import get_resolver
+    from api.services.supabase_client import get_supabase
+    import api.services.anomalies, api.services.series  # noqa: F401  (numpy)
+
+    get_resolver().url_patterns  # imports every view module
+    get_supabase().postgrest  # creates the client and its HTTP session
@@ -10,7 +10,10 @@ https://docs.djangoproject.com/en/6.0/howto/deployment/wsgi/
 import os
 
 from django.core.wsgi import get_wsgi_application
+from .warmup import warm_up
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_swim_api.settings')
 
 application = get_wsgi_application()
+
+warm_up()